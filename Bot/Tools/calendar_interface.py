@@ -1,57 +1,231 @@
-import datetime
-import os.path
-import requests
+"""
+Answers "what's on today / tomorrow / this week" from a local copy of the
+primary Google Calendar (see calendar_store), so a query never waits on
+the Calendar API.
+
+Setup:
+1. pip install google-api-python-client google-auth-oauthlib
+2. Put the OAuth client ("installed app") in Bot/credentials.json; the
+   first run opens a browser and stores the token in Bot/token.json.
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+The API service is built once, on first use. The store syncs with
+incremental sync tokens: on the first query if it has never synced, then
+on a daemon thread every REFRESH_INTERVAL seconds.
+
+For testing against a local stand-in API (no OAuth):
+    ATHENA_CALENDAR_API=http://127.0.0.1:9001/
+"""
+
+import datetime
+import os
+import threading
+from pathlib import Path
+from calendar_store import CalendarStore
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
+CALENDAR_ID = "primary"
+REFRESH_INTERVAL = 300          # seconds between background syncs
+BOT_ROOT = Path(__file__).resolve().parents[1]
+STORE_PATH = os.environ.get("ATHENA_CALENDAR_CACHE", str(BOT_ROOT / ".calendar_store.json"))
 
-def main():
+TOOL_SPEC = {
+    "intent": "calendar",
+    "description": "Tell you what's in your Google Calendar today, tomorrow or this week.",
+    "timeout": 15,
+    "max_concurrency": 2,
+    "commands": {
+        "events_today": {
+            "examples": ["what's on today", "what's on my calendar today", "show my schedule",
+                         "do i have any meetings today", "what's my schedule today"],
+            "params": [],
+            "function": "events_today"
+        },
+        "events_tomorrow": {
+            "examples": ["what's on tomorrow", "what's on my calendar tomorrow", "do i have any meetings tomorrow",
+                         "what's my schedule tomorrow"],
+            "params": [],
+            "function": "events_tomorrow"
+        },
+        "events_this_week": {
+            "examples": ["what's on this week", "what's on my calendar this week", "my schedule this week",
+                         "what meetings do i have this week"],
+            "params": [],
+            "function": "events_this_week"
+        },
+        "sync_calendar": {
+            "examples": ["sync my calendar", "refresh my calendar", "update my calendar"],
+            "params": [],
+            "function": "sync_calendar"
+        }
+    }
+}
+
+
+# -------------------------------
+# Service + store (created on first use)
+# -------------------------------
+_service = None
+_store = None
+_init_lock = threading.Lock()
+_refresher = None
+_stop = threading.Event()
+
+
+def _credentials():
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    token_path = BOT_ROOT / "token.json"
     creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json")
+    if token_path.exists():
+        creds = Credentials.from_authorized_user_file(str(token_path), SCOPES)
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
-
         else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+            flow = InstalledAppFlow.from_client_secrets_file(str(BOT_ROOT / "credentials.json"), SCOPES)
             creds = flow.run_local_server(port=0)
 
-        with open("token.json", "w") as token:
+        with open(token_path, "w") as token:
             token.write(creds.to_json())
+    return creds
 
-    try:
-        service = build("calendar", "v3", credentials=creds)
-
-        colours = {
-            1 : "Light blue",
-            2 : "Light green",
-            3 : "Lavendar",
-            4 : "Salmon",
-            5 : "Yellow",
-            6 : "Orange",
-            7 : "Cyan",
-            8 : "Gray",
-            9 : "Blue",
-            10 : "Green",
-            11 : "Red",
-        }
 
-        event = {
-            "summary" : "My Python Event",
-            "location" : "Somewhere Online",
-            "description" : "Some more details on this awesome event"
-        }
+def _client():
+    global _service
+    with _init_lock:
+        if _service is None:
+            from googleapiclient.discovery import build
+            api = os.environ.get("ATHENA_CALENDAR_API")
+            if api:
+                from google.auth.credentials import AnonymousCredentials
+                _service = build("calendar", "v3", credentials=AnonymousCredentials(), static_discovery=True,
+                                 client_options={"api_endpoint": api}, cache_discovery=False)
+            else:
+                _service = build("calendar", "v3", credentials=_credentials(), cache_discovery=False)
+        return _service
+
+
+def _list_events(**params):
+    return _client().events().list(**params).execute()
+
+
+def _cal():
+    global _store
+    with _init_lock:
+        if _store is None:
+            _store = CalendarStore(STORE_PATH)
+    return _store
+
+
+def _sync():
+    stats = _cal().sync(_list_events, CALENDAR_ID)
+    print(f"[CALENDAR] Synced ({stats['mode']}): {stats['changed']} changes, "
+          f"{stats['events']} events in {stats['seconds']:.2f}s")
+    return stats
+
+
+def _start_refresher():
+    """
+    Sync every REFRESH_INTERVAL on a daemon thread (once per process).
+    """
+    global _refresher
+    with _init_lock:
+        if _refresher and _refresher.is_alive():
+            return _refresher
+
+        def _run():
+            while not _stop.wait(0 if _cal().age() >= REFRESH_INTERVAL else REFRESH_INTERVAL):
+                try:
+                    _sync()
+                except Exception as e:
+                    print(f"[CALENDAR] ⚠️ Background sync failed: {e}")
+                    _stop.wait(REFRESH_INTERVAL)
 
-    except HttpError as error:
-        print("An error occured:", error)
+        _stop.clear()
+        _refresher = threading.Thread(target=_run, name="athena-calendar-sync", daemon=True)
+        _refresher.start()
+        return _refresher
+
+
+def _ready():
+    """
+    The store, synced inline only if it has never been synced.
+    """
+    store = _cal()
+    if not store.synced_at:
+        _sync()
+    _start_refresher()
+    return store
+
+
+async def prefetch(cmd=None, params=None, **_):
+    """
+    Speculation hook: load the store and make sure it's being refreshed.
+    """
+    _cal()
+    _start_refresher()
+
+
+# -------------------------------
+# Formatting
+# -------------------------------
+def _describe(event):
+    if event["all_day"]:
+        text = f"{event['summary']} (all day)"
+    else:
+        text = f"{event['start'][11:16]} {event['summary']}"
+    if event.get("location"):
+        text += f" at {event['location']}"
+    return text
+
+
+def _day_summary(label, events):
+    if not events:
+        return f"Nothing on your calendar {label}."
+    return f"{label.capitalize()}: " + "; ".join(_describe(e) for e in events) + "."
+
+
+# -------------------------------
+# Command implementations
+# -------------------------------
+def events_today(**_):
+    return _day_summary("today", _ready().on(datetime.date.today()))
+
+
+def events_tomorrow(**_):
+    return _day_summary("tomorrow", _ready().on(datetime.date.today() + datetime.timedelta(days=1)))
+
+
+def events_this_week(**_):
+    today = datetime.date.today()
+    days = _ready().between(today, today + datetime.timedelta(days=6 - today.weekday()))
+    if not days:
+        return "Nothing on your calendar for the rest of the week."
+    return " ".join(_day_summary(day.strftime("%A"), events) for day, events in days.items())
+
+
+def sync_calendar(**_):
+    stats = _sync()
+    return f"Calendar synced: {stats['events']} events ({stats['changed']} changes)."
+
+
+def shutdown():
+    """
+    Stop the background refresh and persist the store.
+    """
+    _stop.set()
+    if _store is not None:
+        _store.save()
+
+
+def main():
+    print(sync_calendar())
+    print(events_today())
+    print(events_this_week())
 
 
 def context_for_add_meeting():
@@ -73,9 +247,9 @@ def context_for_add_meeting():
 
     # Combine all context definitions
     context_definitions = {**required_context, **optional_context}
-    
+
     #print("Context being sent:", required_context, optional_context, open_ended_required, open_ended_optional, close_ended_required, close_ended_optional)
-    
+
     return required_context, optional_context, open_ended_required, open_ended_optional, close_ended_required, close_ended_optional
 
 def action_for_add_meeting(context):
@@ -88,4 +262,8 @@ def action_for_add_meeting(context):
     description = context.get("description", "no description")
     reminder_notification = context.get("reminder_notification", "no reminders")
 
-    return f"The context is, {context}"
\ No newline at end of file
+    return f"The context is, {context}"
+
+
+if __name__ == "__main__":
+    main()
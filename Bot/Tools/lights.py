@@ -1,16 +1,29 @@
 import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
 from pywizlight import wizlight, PilotBuilder
+from pywizlight.exceptions import WizLightConnectionError, WizLightTimeOutError
+from gazetteer import Gazetteer, blank, first
+from device_registry import DEVICES
 
-DEVICE_IPS = {
-    "bottom lamp light": "192.168.0.153",
-    "middle lamp light": "192.168.0.91",
-    "mushroom light": "192.168.0.228",
-    "top lamp light": "192.168.0.149"
-}
+# Bulb names and addresses live in config/devices.json (see device_registry),
+# scenes (a pilot state per bulb, "*" = every other bulb) in config/scenes.json.
+SCENES_PATH = os.environ.get("ATHENA_SCENES", str(Path(__file__).resolve().parents[2] / "config" / "scenes.json"))
+
+# How long a remembered bulb state is trusted (the WiZ app / wall switch can change it behind our back)
+STATE_TTL = 30.0
+SEND_TIMEOUT = 1.5      # per bulb and attempt
+SEND_RETRIES = 1        # then a bulb that still doesn't answer is looked for again on the network
+DISCOVERY_TIMEOUT = 1.0
+UNREACHABLE = (asyncio.TimeoutError, OSError, WizLightConnectionError, WizLightTimeOutError)
 
 TOOL_SPEC = {
     "intent": "light_control",
-    "description": "Control WizLights (on/off/brightness/temp)",
+    "description": "Control WizLights (on/off/brightness/temp/scenes)",
+    "timeout": 10,
     "commands": {
         "turn_on": {
             "examples": ["turn on", "switch on", "turn on my lights", "lights on", "illuminate"],
@@ -39,70 +52,268 @@ TOOL_SPEC = {
             "params": ["device", "color_temp"],
             "defaults": {"device": "all", "color_temp": "warm"},
             "function": "set_color_temp"
+        },
+        "get_state": {
+            "examples": ["are my lights on", "are the lights off", "light status", "what are my lights set to"],
+            "params": ["device"],
+            "defaults": {"device": "all"},
+            "function": "get_state"
+        },
+        "set_scene": {
+            "examples": ["movie mode", "set the movie scene", "it's movie time", "bedtime lights", "bedtime mode",
+                         "it's bedtime",
+                         "set the lights for reading", "activate scene", "lights scene"],
+            "params": ["scene"],
+            "function": "set_scene"
+        },
+        "discover_lights": {
+            "examples": ["find my lights", "scan for lights", "discover new lights", "search for bulbs"],
+            "params": [],
+            "function": "discover_lights"
+        }
+    },
+    "vocabulary": {
+        "device": {
+            "all": ["all", "all lights", "all the lights", "my lights", "every light"]
+        },
+        "color_temp": {
+            "warm": ["warm", "warmer"],
+            "cool": ["cool", "cooler", "colder"]
+        },
+        "scene": {
+            "movie": ["movie", "movie mode", "movie time", "movie scene", "cinema"],
+            "bedtime": ["bedtime", "bed time", "bedtime mode", "night mode"],
+            "reading": ["reading", "reading mode", "reading scene"],
+            "bright": ["bright mode", "full brightness", "bright scene"]
         }
     }
 }
 
+NUMBER_RE = re.compile(r"(\d+)\s?%?")
+_gazetteer = None   # own vocabulary + device names, for callers that don't pass spans
+_gazetteer_version = None
+
+# -------------------------------
+# Bulb pool + last-known state
+# -------------------------------
+# wizlight handles bind to the event loop they were created on, so the pool
+# belongs to one loop (normally MultiStageProcessor's persistent loop).
+_POOL = {}          # ip -> wizlight
+_POOL_LOOP = None
+_STATE = {}         # device name -> {"on", "brightness", "colortemp", "ts"}
+_SCENES = {"mtime": None, "scenes": {}, "gazetteer": None}
+
+def _bulb(ip):
+    global _POOL_LOOP
+    loop = asyncio.get_running_loop()
+    if loop is not _POOL_LOOP:
+        # handles from another loop can't be reused; wizlight.__del__ closes them there
+        _POOL.clear()
+        _POOL_LOOP = loop
+    bulb = _POOL.get(ip)
+    if bulb is None:
+        bulb = _POOL[ip] = wizlight(ip, port=DEVICES.port)
+    return bulb
+
+def _known_state(name):
+    st = _STATE.get(name)
+    if st and time.monotonic() - st["ts"] <= STATE_TTL:
+        return st
+    return None
+
+def _remember(name, on, **fields):
+    st = _STATE.get(name) or {"on": None, "brightness": None, "colortemp": None}
+    st = {**st, "on": on, "ts": time.monotonic()}
+    if on:
+        st.update(fields)
+    _STATE[name] = st
+
+def _unchanged(name, on, **fields):
+    st = _known_state(name)
+    if not st or st["on"] != on:
+        return False
+    return all(st.get(k) == v for k, v in fields.items())
+
+async def _send_pilots(pilots):
+    """
+    pilots = {name: (ip, on, fields)}, all sent concurrently (see
+    _each_bulb). Remembers what each bulb was set to; a bulb that failed
+    is forgotten. Returns {name: None or exception}.
+    """
+    def send(name, ip):
+        _, on, fields = pilots[name]
+        bulb = _bulb(ip)
+        return bulb.turn_on(PilotBuilder(**fields)) if on else bulb.turn_off()
+
+    results = await _each_bulb([(name, ip) for name, (ip, _, _) in pilots.items()], send)
+    outcome = {}
+    for name, res in results.items():
+        if isinstance(res, BaseException):
+            _STATE.pop(name, None)
+            outcome[name] = res
+        else:
+            _, on, fields = pilots[name]
+            _remember(name, on, **fields)
+            outcome[name] = None
+    return outcome
+
+async def _apply(device, on, label, **fields):
+    """
+    Send one pilot change to every target bulb, skipping bulbs whose
+    remembered state already matches. Raises after the other bulbs have
+    been updated if any bulb failed.
+    """
+    pending = {}
+    for name, ip in await _targets_with_addresses(device):
+        if _unchanged(name, on, **fields):
+            print(f"[LIGHTS] {label} → {name} (unchanged, skipped)")
+            continue
+        pending[name] = (ip, on, fields)
+        print(f"[LIGHTS] {label} → {name}")
+
+    failed = {name: e for name, e in (await _send_pilots(pending)).items() if e is not None}
+    unreachable = [name for name, e in failed.items() if isinstance(e, UNREACHABLE)]
+    if unreachable:
+        # name the bulbs: a per-bulb TimeoutError doesn't say which one didn't answer
+        raise RuntimeError(f"couldn't reach {', '.join(unreachable)}")
+    if failed:
+        raise next(iter(failed.values()))
+
+async def _read_state(name, ip):
+    st = _known_state(name)
+    if st:
+        return st
+    parsed = (await _bulb(ip).updateState() or [None])[0]
+    if parsed is None:
+        return None
+    if parsed.get_state():
+        _remember(name, True, brightness=parsed.get_brightness(), colortemp=parsed.get_colortemp())
+    else:
+        _remember(name, False)
+    return _STATE[name]
+
+async def _each_bulb(targets, call):
+    """
+    call(name, ip) for every (name, ip) concurrently, each attempt bounded
+    by SEND_TIMEOUT and retried SEND_RETRIES times. Bulbs that still don't
+    answer are looked up again with one discovery scan, and the ones found
+    at a new address are tried once more. Returns {name: result or exception}.
+    """
+    async def attempt(name, ip, retries=0):
+        for n in range(retries + 1):
+            try:
+                return await asyncio.wait_for(call(name, ip), SEND_TIMEOUT)
+            except UNREACHABLE:
+                if n == retries:
+                    raise
+
+    targets = list(targets)
+    outcomes = await asyncio.gather(*(attempt(name, ip, SEND_RETRIES) for name, ip in targets),
+                                    return_exceptions=True)
+    results = {name: res for (name, _), res in zip(targets, outcomes)}
+    failed = [name for name, res in results.items() if isinstance(res, UNREACHABLE)]
+    if failed:
+        moved = await DEVICES.rediscover(failed, DISCOVERY_TIMEOUT)
+        if moved:
+            retries = await asyncio.gather(*(attempt(name, ip) for name, ip in moved.items()),
+                                           return_exceptions=True)
+            results.update(zip(moved, retries))
+    return results
+
+async def prefetch(cmd=None, params=None, **_):
+    """
+    Speculative warm-up (see MultiStageProcessor.speculate): open handles
+    for the bulbs a command is about to hit and refresh their state.
+    Read-only: nothing is sent that changes a bulb.
+    """
+    device = (params or {}).get("device")
+    await _each_bulb(await _targets_with_addresses(device), _read_state)
+
+async def shutdown():
+    """
+    Close every pooled bulb transport. Called by MultiStageProcessor.close().
+    """
+    global _POOL_LOOP
+    bulbs = list(_POOL.values())
+    _POOL.clear()
+    _POOL_LOOP = None
+    await asyncio.gather(*(b.async_close() for b in bulbs), return_exceptions=True)
+
 def _targets(device):
     if not device or device == "all":
-        return list(DEVICE_IPS.items())
+        return DEVICES.items()
     # allow partial matches
     dev = device.lower()
-    return [(name, ip) for name, ip in DEVICE_IPS.items() if dev in name]
+    return [(name, ip) for name, ip in DEVICES.items() if dev in name]
+
+async def _targets_with_addresses(device):
+    """
+    _targets, scanning the network first if no bulb has an address yet.
+    The first call also starts learning the MACs of bulbs named by IP only.
+    """
+    if not DEVICES.items():
+        await DEVICES.discover(DISCOVERY_TIMEOUT)
+    DEVICES.learn_in_background()
+    return _targets(device)
+
+def _device_gazetteer():
+    global _gazetteer, _gazetteer_version
+    if _gazetteer is None or _gazetteer_version != DEVICES.version:
+        _gazetteer_version = DEVICES.version
+        _gazetteer = Gazetteer.from_vocabulary(TOOL_SPEC["vocabulary"], DEVICES.vocabulary())
+    return _gazetteer
+
+def resolve_params(text: str, spans=None, cmd=None, **_):
+    """
+    Pull device / brightness / color_temp / scene out of the text. `spans`
+    are gazetteer matches computed once by the processor; without them the
+    tool's own vocabulary is used. A scene is only picked for set_scene
+    (or, without a cmd, when no brightness / colour was given).
+    """
+    if spans is None:
+        spans = _device_gazetteer().find(text)
 
-def resolve_params(text: str):
-    t = text.lower()
     out = {}
-    # device
-    if "all" in t or "my lights" in t or "lights" == t.strip():
+    # device ("all" wins over a named light, as before)
+    devices = [s.value for s in spans if s.label == "device"]
+    if "all" in devices or text.lower().strip() == "lights":
         out["device"] = "all"
-    else:
-        for name in DEVICE_IPS.keys():
-            if name in t:
-                out["device"] = name
-                break
+    elif devices:
+        out["device"] = devices[0]
     # brightness (numbers in text)
-    m = __import__("re").search(r"(\d+)\s?%?", t)
+    m = NUMBER_RE.search(blank(text, spans, "device"))
     if m:
         out["brightness"] = int(m.group(1))
     # color temp
-    if "warmer" in t or "warm" in t:
-        out["color_temp"] = "warm"
-    elif "cooler" in t or "cool" in t or "colder" in t:
-        out["color_temp"] = "cool"
+    color_temp = first(spans, "color_temp")
+    if color_temp:
+        out["color_temp"] = color_temp
+    # scene: whole phrases from the vocabulary or scenes.json, longest wins
+    if cmd == "set_scene" or (cmd is None and "brightness" not in out and "color_temp" not in out):
+        scenes = [s for s in _scene_gazetteer().find(text) if s.label == "scene"]
+        if scenes:
+            out["scene"] = max(scenes, key=lambda s: s.end - s.start).value
     return out
 
 async def turn_on(device=None, **_):
-    tasks = []
-    for name, ip in _targets(device):
-        bulb = wizlight(ip)
-        tasks.append(bulb.turn_on(PilotBuilder()))
-        print(f"[LIGHTS] ON → {name}")
-    await asyncio.gather(*tasks)
+    await _apply(device, True, "ON")
     return f"Turning on {device or 'all lights'}."
 
 async def turn_off(device=None, **_):
-    tasks = []
-    for name, ip in _targets(device):
-        bulb = wizlight(ip)
-        tasks.append(bulb.turn_off())
-        print(f"[LIGHTS] OFF → {name}")
-    await asyncio.gather(*tasks)
+    await _apply(device, False, "OFF")
     return f"Turning off {device or 'all lights'}."
 
-async def set_brightness(device=None, brightness=None, **_):
+def _to_255(brightness):
     # clamp to [10..255] if they gave a 0-100 value, scale to 0-255
-    if brightness is None:
-        brightness = 128
     if brightness <= 100:
         brightness = int(round((brightness / 100.0) * 255))
-    brightness = max(10, min(255, brightness))
-    tasks = []
-    for name, ip in _targets(device):
-        bulb = wizlight(ip)
-        tasks.append(bulb.turn_on(PilotBuilder(brightness=brightness)))
-        print(f"[LIGHTS] Brightness {brightness}/255 → {name}")
-    await asyncio.gather(*tasks)
+    return max(10, min(255, brightness))
+
+async def set_brightness(device=None, brightness=None, **_):
+    if brightness is None:
+        brightness = 128
+    brightness = _to_255(brightness)
+    await _apply(device, True, f"Brightness {brightness}/255", brightness=brightness)
     pct = int(round(brightness / 255 * 100))
     return f"Set brightness of {device or 'all lights'} to {pct}%."
 
@@ -117,10 +328,114 @@ async def set_color_temp(device=None, color_temp=None, **_):
     elif isinstance(color_temp, (int, float)):
         K = int(color_temp)
     K = max(2200, min(6500, K))
-    tasks = []
-    for name, ip in _targets(device):
-        bulb = wizlight(ip)
-        tasks.append(bulb.turn_on(PilotBuilder(colortemp=K)))
-        print(f"[LIGHTS] Temp {K}K → {name}")
-    await asyncio.gather(*tasks)
+    await _apply(device, True, f"Temp {K}K", colortemp=K)
     return f"Set color temperature of {device or 'all lights'} to {K}K."
+
+async def get_state(device=None, **_):
+    targets = await _targets_with_addresses(device)
+    states = await _each_bulb(targets, _read_state)
+    parts = []
+    for name, _ip in targets:
+        st = states[name]
+        if isinstance(st, BaseException) or st is None:
+            parts.append(f"{name} is not responding")
+        elif not st["on"]:
+            parts.append(f"{name} is off")
+        else:
+            extra = []
+            if st.get("brightness") is not None:
+                extra.append(f"{int(round(st['brightness'] / 255 * 100))}%")
+            if st.get("colortemp"):
+                extra.append(f"{st['colortemp']}K")
+            parts.append(f"{name} is on" + (f" ({', '.join(extra)})" if extra else ""))
+    if not parts:
+        return f"I don't know a light called {device}."
+    summary = "; ".join(parts)
+    return summary[:1].upper() + summary[1:] + "."
+
+async def discover_lights(**_):
+    info = await DEVICES.discover(DISCOVERY_TIMEOUT * 2)
+    if not info["found"]:
+        return "I couldn't find any lights on the network."
+    summary = f"Found {info['found']} lights"
+    if info["moved"]:
+        summary += f"; {', '.join(info['moved'])} moved"
+    if info["added"]:
+        summary += f"; new: {', '.join(info['added'])}"
+    return summary + "."
+
+def _scenes():
+    """
+    Scenes from scenes.json, re-read when the file changes.
+    """
+    try:
+        mtime = os.stat(SCENES_PATH).st_mtime_ns
+    except OSError:
+        return _SCENES["scenes"]
+    if mtime != _SCENES["mtime"]:
+        try:
+            with open(SCENES_PATH, "r", encoding="utf-8") as f:
+                scenes = {name.lower(): plan for name, plan in json.load(f).items()}
+            _SCENES.update(mtime=mtime, scenes=scenes, gazetteer=None)
+        except (OSError, ValueError) as e:
+            print(f"[LIGHTS] ⚠️ Could not read {SCENES_PATH}: {e}")
+    return _SCENES["scenes"]
+
+def _scene_gazetteer():
+    """
+    Scene phrases: TOOL_SPEC's plus "<name>", "<name> mode", "<name> scene"
+    for every scene in scenes.json. Rebuilt when the file changes.
+    """
+    scenes = _scenes()
+    if _SCENES["gazetteer"] is None:
+        _SCENES["gazetteer"] = Gazetteer.from_vocabulary(
+            {"scene": TOOL_SPEC["vocabulary"]["scene"]},
+            {"scene": {name: [name, f"{name} mode", f"{name} scene"] for name in scenes}})
+    return _SCENES["gazetteer"]
+
+def _pilot(target):
+    """
+    Scene entry {"on", "brightness" (%), "colortemp" (K)} -> (on, PilotBuilder fields).
+    """
+    on = target.get("on", True)
+    fields = {}
+    if on and target.get("brightness") is not None:
+        fields["brightness"] = _to_255(target["brightness"])
+    if on and target.get("colortemp") is not None:
+        fields["colortemp"] = max(2200, min(6500, int(target["colortemp"])))
+    return on, fields
+
+async def set_scene(scene=None, **_):
+    """
+    Give every bulb its own state from the scene. Only bulbs whose last
+    known state differs are sent to, all at once; bulbs that can't be
+    reached are reported, the rest of the scene is still applied.
+    """
+    scenes = _scenes()
+    plan = scenes.get((scene or "").strip().lower())
+    if plan is None:
+        known = ", ".join(scenes) or "none yet"
+        return f"I don't know a scene called {scene}. Scenes: {known}." if scene else f"Which scene? ({known})"
+
+    pending, unchanged = {}, 0
+    for name, ip in await _targets_with_addresses("all"):
+        target = plan.get(name, plan.get("*"))
+        if target is None:
+            continue
+        on, fields = _pilot(target)
+        if _unchanged(name, on, **fields):
+            unchanged += 1
+            continue
+        pending[name] = (ip, on, fields)
+    print(f"[LIGHTS] Scene {scene} → {', '.join(pending) or 'nothing to change'}")
+
+    outcome = await _send_pilots(pending)
+    failed = [name for name, error in outcome.items() if error is not None]
+    if failed and len(failed) == len(pending) and not unchanged:
+        return f"Couldn't set the {scene} scene: none of the lights responded."
+    summary = f"{scene.capitalize()} scene set: {len(pending) - len(failed)} lights changed"
+    if unchanged:
+        summary += f", {unchanged} already set"
+    if failed:
+        summary += f"; couldn't reach {', '.join(failed)}"
+    return summary + "."
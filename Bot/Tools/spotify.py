@@ -1,112 +1,371 @@
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-import Tools.login as login
+import os
+import re
+import json
+import random
+import threading
+from pathlib import Path
+from spotify_library import SpotifyLibrary
 
 # Documentation
 """
 This script allows basic control of Spotify playback using the Spotipy library.
-It supports actions such as playing a track, pausing, skipping to the next track, and adjusting volume.
+It supports actions such as playing liked songs or a playlist, pausing,
+resuming, skipping to the next track, and adjusting volume.
 
 Setup:
 1. Install Spotipy using `pip install spotipy`.
 2. Set up a Spotify Developer account and create an application.
-3. Replace 'YOUR_CLIENT_ID', 'YOUR_CLIENT_SECRET', and 'YOUR_REDIRECT_URI' with your actual credentials.
+3. Put the app's credentials in Bot/credentials.json:
+   {"spotify_client_id": "...", "spotify_client_secret": "..."}
 
-Usage:
-- Run the script and use the provided functions to control Spotify playback.
+Liked songs, playlists and the last known playback state are mirrored in
+Bot/.spotify_library.json (see spotify_library), so playback commands
+don't wait on the Web API to look things up. The mirror syncs in the
+background once it is older than SYNC_INTERVAL.
+
+For testing against a local stand-in API:
+    ATHENA_SPOTIFY_API=http://127.0.0.1:9000/v1/  ATHENA_SPOTIFY_TOKEN=test
 """
 
-# Set up authentication
-sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-    client_id=str(login.spotify_login()[1]),
-    client_secret=str(login.spotify_login()[0]),
-    redirect_uri="http://localhost:8080",
-    scope="user-library-read,user-read-playback-state,user-modify-playback-state"
-))
+REDIRECT_URI = "http://localhost:8080"
+SCOPE = "user-library-read,playlist-read-private,user-read-playback-state,user-modify-playback-state"
+SYNC_INTERVAL = 6 * 3600       # seconds before the library mirror is refreshed in the background
+MAX_QUEUE = 100                # uris sent in one start_playback call
+BOT_ROOT = Path(__file__).resolve().parents[1]
+LIBRARY_PATH = os.environ.get("ATHENA_SPOTIFY_CACHE", str(BOT_ROOT / ".spotify_library.json"))
+
+TOOL_SPEC = {
+    "intent": "music",
+    "description": "Control Spotify playback (liked songs, playlists, pause/resume/skip/volume).",
+    "timeout": 15,
+    "max_concurrency": 2,
+    "commands": {
+        "play_liked_songs": {
+            "examples": ["play my liked songs", "play my music", "play some music", "put on my favourites",
+                         "shuffle my liked songs"],
+            "params": [],
+            "function": "play_liked_songs"
+        },
+        "play_playlist": {
+            "examples": ["play my playlist", "play the workout playlist", "put on my chill playlist",
+                         "play playlist"],
+            "params": ["playlist"],
+            "function": "play_playlist"
+        },
+        "pause": {
+            "examples": ["pause", "pause the music", "pause spotify", "stop the music"],
+            "params": [],
+            "function": "pause"
+        },
+        "resume": {
+            "examples": ["resume", "resume the music", "continue playing", "unpause"],
+            "params": [],
+            "function": "resume"
+        },
+        "skip": {
+            "examples": ["skip", "skip this song", "next song", "next track"],
+            "params": [],
+            "function": "skip"
+        },
+        "volume_up": {
+            "examples": ["volume up", "turn the music up", "louder"],
+            "params": [],
+            "function": "volume_up"
+        },
+        "volume_down": {
+            "examples": ["volume down", "turn the music down", "quieter"],
+            "params": [],
+            "function": "volume_down"
+        },
+        "sync_library": {
+            "examples": ["sync my music library", "refresh my spotify library", "update my liked songs"],
+            "params": [],
+            "function": "sync_library"
+        }
+    }
+}
+
+_PLAYLIST_RE = re.compile(r"play(?:\s+my|\s+the)?\s+(.+?)\s+playlist\b|playlist\s+(?:called\s+|named\s+)?(.+)$")
+
+
+def _load_credentials():
+    """
+    Loads Spotify app credentials from credentials.json in the Bot root folder.
+    """
+    cred_path = BOT_ROOT / "credentials.json"
+    try:
+        with open(cred_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"[SPOTIFY] ⚠️ credentials.json not found at {cred_path}")
+        return None, None
+    except Exception as e:
+        print(f"[SPOTIFY] ⚠️ Failed to load credentials: {e}")
+        return None, None
+    return data.get("spotify_client_id"), data.get("spotify_client_secret")
+
+
+# -------------------------------
+# Client + library (created on first use)
+# -------------------------------
+_sp = None
+_library = None
+_init_lock = threading.Lock()
+_sync_thread = None
+
+
+def _client():
+    global _sp
+    with _init_lock:
+        if _sp is None:
+            import spotipy
+            api = os.environ.get("ATHENA_SPOTIFY_API")
+            if api:
+                _sp = spotipy.Spotify(auth=os.environ.get("ATHENA_SPOTIFY_TOKEN", "test"), retries=0)
+                _sp.prefix = api if api.endswith("/") else api + "/"
+            else:
+                from spotipy.oauth2 import SpotifyOAuth
+                client_id, client_secret = _load_credentials()
+                if not client_id or not client_secret:
+                    raise RuntimeError("Spotify credentials not loaded (check credentials.json).")
+                _sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    redirect_uri=REDIRECT_URI,
+                    scope=SCOPE
+                ))
+        return _sp
+
+
+def _lib():
+    global _library
+    with _init_lock:
+        if _library is None:
+            _library = SpotifyLibrary(LIBRARY_PATH)
+    return _library
+
+
+def _sync_in_background(force=False):
+    """
+    Refresh the mirror on a daemon thread if it's stale (or force).
+    """
+    global _sync_thread
+    library = _lib()
+    if not force and library.age() < SYNC_INTERVAL:
+        return None
+    with _init_lock:
+        if _sync_thread and _sync_thread.is_alive():
+            return _sync_thread
+
+        def _run():
+            try:
+                stats = library.sync(_client())
+                print(f"[SPOTIFY] Library synced ({stats['mode']}): {stats['tracks']} tracks, "
+                      f"{stats['new']} new, {stats['playlists']} playlists in {stats['seconds']:.1f}s")
+            except Exception as e:
+                print(f"[SPOTIFY] ⚠️ Library sync failed: {e}")
+
+        _sync_thread = threading.Thread(target=_run, name="athena-spotify-sync", daemon=True)
+        _sync_thread.start()
+        return _sync_thread
+
+
+def _playback_call(method, **kwargs):
+    """
+    Call a playback endpoint; on failure (state changed elsewhere, device
+    gone) refresh the cached playback state once before giving up.
+    """
+    sp = _client()
+    try:
+        return getattr(sp, method)(**kwargs)
+    except Exception:
+        try:
+            _refresh_playback()
+        except Exception:
+            pass
+        raise
+
+
+def _refresh_playback():
+    info = _client().current_playback()
+    if not info:
+        _lib().remember_playback(is_playing=False, device_id=None)
+        return None
+    device = info.get("device") or {}
+    _lib().remember_playback(is_playing=bool(info.get("is_playing")), volume=device.get("volume_percent"),
+                             device_id=device.get("id"), track_uri=(info.get("item") or {}).get("uri"))
+    return info
+
+
+def _playback(confirm=None):
+    """
+    Cached playback state. Spotify is only asked if we've never seen one,
+    or to double-check before refusing (cache says is_playing == confirm,
+    e.g. "nothing is playing" when playback was started on the phone).
+    """
+    state = _lib().playback
+    if not state.get("updated") or (confirm is not None and bool(state.get("is_playing")) == confirm):
+        _refresh_playback()
+        state = _lib().playback
+    return state
+
+
+# -------------------------------
+# Param resolution
+# -------------------------------
+def resolve_params(text: str, **_):
+    """
+    "play my workout playlist" / "play playlist chill vibes" -> {"playlist": ...}
+    """
+    m = _PLAYLIST_RE.search(text.lower().strip())
+    if not m:
+        return {}
+    name = (m.group(1) or m.group(2) or "").strip()
+    return {"playlist": name} if name and name not in ("my", "a", "the") else {}
+
+
+async def prefetch(cmd=None, params=None, **_):
+    """
+    Speculation hook: make sure the library mirror is loaded (and syncing if stale).
+    """
+    _sync_in_background()
+
 
+# -------------------------------
+# Command implementations
+# -------------------------------
 # Function to play a track by its Spotify URI
 def play_track(track_uri):
-    sp.start_playback(uris=[track_uri])
-
-def play_liked_songs():
-    # Get the user's saved tracks (Liked Songs)
-    results = sp.current_user_saved_tracks()
-    
-    # Extract the track URIs
-    track_uris = [item['track']['uri'] for item in results['items']]
-    
-    # Start playback of the liked songs
-    if track_uris:
-        sp.start_playback(uris=track_uris)
+    _playback_call("start_playback", uris=[track_uri])
+    _lib().remember_playback(is_playing=True, track_uri=track_uri)
+
+
+def play_liked_songs(shuffle=True, **_):
+    library = _lib()
+    if not library.track_uris():
+        library.sync(_client())          # first run: nothing cached yet
     else:
-        print("No liked songs found.")
+        _sync_in_background()
+    uris = library.track_uris()
+    if not uris:
+        return "No liked songs found."
+
+    picked = random.sample(uris, min(MAX_QUEUE, len(uris))) if shuffle else uris[:MAX_QUEUE]
+    _playback_call("start_playback", uris=picked)
+    library.remember_playback(is_playing=True, track_uri=picked[0])
+    return f"Playing your liked songs ({len(uris)} in your library)."
+
+
+def play_playlist(playlist=None, **_):
+    library = _lib()
+    if not library.playlists:
+        library.sync(_client())
+    found = library.playlist(playlist)
+    if not found:
+        _sync_in_background()
+        return f"I couldn't find a playlist called {playlist}."
+    _playback_call("start_playback", context_uri=found["uri"])
+    library.remember_playback(is_playing=True, track_uri=None)
+    return f"Playing {found['name']}."
+
 
 # Function to pause playback
-def pause():
-    playback_info = sp.current_playback()
-    if playback_info and playback_info['is_playing']:
-        sp.pause_playback()
-        print("Playback paused.")
-    else:
-        print("No song is currently playing.")
+def pause(**_):
+    if not _playback(confirm=False).get("is_playing"):
+        return "No song is currently playing."
+    _playback_call("pause_playback")
+    _lib().remember_playback(is_playing=False)
+    return "Playback paused."
+
 
 # Function to resume playback
-def resume():
-    playback_info = sp.current_playback()
-    if playback_info and not playback_info['is_playing']:
-        sp.start_playback()
-        print("Playback resumed.")
-    else:
-        print("Song is already playing or no active device found.")
+def resume(**_):
+    state = _playback(confirm=True)
+    if state.get("is_playing"):
+        return "Song is already playing."
+    _playback_call("start_playback", device_id=state.get("device_id"))
+    _lib().remember_playback(is_playing=True)
+    return "Playback resumed."
+
 
 # Function to skip to the next track
-def skip():
-    sp.next_track()
+def skip(**_):
+    _playback_call("next_track")
+    _lib().remember_playback(is_playing=True, track_uri=None)
+    return "Skipped."
+
 
 # Function to set volume (0 to 100)
-def volume_up(volume):
-    sp.volume(volume)
+def set_volume(volume, **_):
+    volume = max(0, min(100, int(volume)))
+    _playback_call("volume", volume_percent=volume)
+    _lib().remember_playback(volume=volume)
+    return f"Volume set to {volume}%."
+
+
+def volume_up(step=10, **_):
+    current = _playback().get("volume")
+    return set_volume((current if current is not None else 50) + step)
 
 
-        
+def volume_down(step=10, **_):
+    current = _playback().get("volume")
+    return set_volume((current if current is not None else 50) - step)
+
+
+def sync_library(**_):
+    stats = _lib().sync(_client())
+    return (f"Synced your Spotify library: {stats['tracks']} liked songs ({stats['new']} new) "
+            f"and {stats['playlists']} playlists.")
+
+
+def action(question):
+    question = question.lower()
+    if "play my liked songs" in question:
+        return play_liked_songs()
+    elif "loop" in question:
+        pass
+    elif "pause" in question:
+        return pause()
+    elif "skip" in question:
+        return skip()
+    elif "resume" in question:
+        return resume()
+    elif "volume up" in question:
+        return volume_up()
+    elif "volume down" in question:
+        return volume_down()
+
+
+def shutdown():
+    """
+    Persist the last known playback state with the library mirror.
+    """
+    if _library is not None:
+        _library.save()
+
 
 # Example usage
 if __name__ == "__main__":
     print("Spotify Control Program")
-    action = input("Enter action (play, pause, skip, volume, resume): ").strip().lower()
+    action = input("Enter action (play, pause, skip, volume, resume, sync): ").strip().lower()
 
     if action == "play":
         track_uri = input("Enter Spotify track URI: ").strip()
         play_track(track_uri)
-        playing = True
 
     elif action == "pause":
-        pause()
-        playing = False
+        print(pause())
 
     elif action == "skip":
-        skip()
+        print(skip())
 
-    elif action == "volume up":
+    elif action == "volume":
         volume = int(input("Enter volume level (0-100): ").strip())
-        #set_volume(volume)
+        print(set_volume(volume))
     elif action == "resume":
-        resume()
+        print(resume())
+    elif action == "sync":
+        print(sync_library())
     else:
         print("Invalid action")
-
-def action(question):
-    if "play my liked songs" in question.lower():
-        play_liked_songs()
-    elif "loop" in question.lower():
-        pass
-    elif "pause" in question.lower():
-        pause()
-    elif "skip" in question.lower():
-        skip()
-    elif "resume" in question.lower():
-        resume()
-    elif "volume up" in question.lower():
-        sp.volume(min(sp.current_playback()['device']['volume_percent'] + 10, 100))
-    elif "volume down" in question.lower():
-        sp.volume(min(sp.current_playback()['device']['volume_percent'] - 10, 0))
\ No newline at end of file
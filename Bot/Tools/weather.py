@@ -1,15 +1,60 @@
 # Tools/weather.py
+"""
+Answers come from a per-city forecast snapshot: current conditions plus
+the FORECAST_DAYS daily forecast, fetched together over one keep-alive
+requests.Session. "now", "tomorrow" and "in N days / on friday" are all
+read from it.
+
+A snapshot is fresh for SNAPSHOT_TTL seconds. After that it is still
+served (and refreshed in the background) for up to MAX_STALE seconds.
+Only a city we've never seen, or one not asked about for hours, waits on
+the network. A city Weatherbit doesn't know is remembered for
+MISSING_TTL, so asking again costs no API calls.
+
+Once weather has been asked for, a daemon thread re-fetches DEFAULT_CITY
+and the cities asked about in the last RECENT_WINDOW seconds (at most
+RECENT_CITIES of them) every REFRESH_INTERVAL seconds. It backs off after
+an error or a 429, and sits a round out once DAILY_CALLS API calls have
+been made in the last 24 hours (answers to questions still go through).
+All three are configurable, since the free tier only allows a few hundred
+calls a day:
+    ATHENA_WEATHER_REFRESH=1800     (0 turns the refresher off)
+    ATHENA_WEATHER_WINDOW=7200
+    ATHENA_WEATHER_DAILY_CALLS=250
+
+For testing against a local stand-in API:
+    ATHENA_WEATHERBIT_API=http://127.0.0.1:9002/v2.0  ATHENA_WEATHERBIT_KEY=test
+"""
+
 import os
 import json
 import re
+import threading
+import time
+import datetime
 import requests
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from pathlib import Path
+from gazetteer import first
 
 # -------------------------------
 # Config / Defaults
 # -------------------------------
 DEFAULT_CITY = "Brisbane"
-WEATHERBIT_BASE = "https://api.weatherbit.io/v2.0"
+WEATHERBIT_BASE = os.environ.get("ATHENA_WEATHERBIT_API", "https://api.weatherbit.io/v2.0").rstrip("/")
+FORECAST_DAYS = 7
+HTTP_TIMEOUT = 8            # per request
+FETCH_TIMEOUT = 9           # both snapshot requests (they run side by side)
+SNAPSHOT_TTL = 600          # Weatherbit "current" only updates every few minutes
+MAX_STALE = 3 * 3600        # older than this, a snapshot is refetched before answering
+MISSING_TTL = 6 * 3600      # how long "no such city" is remembered
+RECENT_CITIES = 4           # most cities the refresher keeps warm
+REFRESH_INTERVAL = float(os.environ.get("ATHENA_WEATHER_REFRESH", "1800"))
+RECENT_WINDOW = float(os.environ.get("ATHENA_WEATHER_WINDOW", str(2 * 3600)))  # since the city was last asked about
+DAILY_CALLS = int(os.environ.get("ATHENA_WEATHER_DAILY_CALLS", "250"))  # background refreshes stop at this many calls a day
+BACKOFF_MIN = 60            # background refreshes pause this long after a failure, doubling up to BACKOFF_MAX
+BACKOFF_MAX = 2 * 3600
 
 def _load_api_key():
     """
@@ -39,7 +84,7 @@ def _load_api_key():
         return None
 
 
-API_KEY = _load_api_key()
+API_KEY = os.environ.get("ATHENA_WEATHERBIT_KEY") or _load_api_key()
 
 # -------------------------------
 # TOOL SPEC (for ToolRegistry/MSP)
@@ -58,7 +103,8 @@ TOOL_SPEC = {
                 "weather in sydney"
             ],
             "params": ["city"],      # MSP will expect 'city', but we provide it via resolve_params
-            "function": "get_weather_now"
+            "function": "get_weather_now",
+            "cache_ttl": 600         # Weatherbit "current" only updates every few minutes
         },
         "get_weather_tomorrow": {
             "examples": [
@@ -71,15 +117,63 @@ TOOL_SPEC = {
                 "what is the weather tomorrow in sydney"
             ],
             "params": ["city"],
-            "function": "get_weather_tomorrow"
+            "function": "get_weather_tomorrow",
+            "cache_ttl": 1800
+        },
+        "get_weather_day": {
+            "examples": [
+                "what's the weather on friday",
+                "weather in three days",
+                "what will the weather be like on the weekend",
+                "forecast for saturday",
+                "weather the day after tomorrow",
+                "what's the forecast for monday in sydney"
+            ],
+            "params": ["city", "day"],
+            "defaults": {"day": 2},
+            "function": "get_weather_day",
+            "cache_ttl": 1800
         }
-        # You can add 3-day forecast later using the same pattern.
+    },
+    "timeout": 10,               # a blocking fetch gives up after FETCH_TIMEOUT (stale snapshots answer instantly)
+    "max_concurrency": 2,        # free Weatherbit tier is rate limited
+    "vocabulary": {
+        "city": [
+            "brisbane", "gold coast", "sunshine coast", "sydney", "melbourne", "canberra", "adelaide",
+            "perth", "hobart", "darwin", "cairns", "townsville", "auckland", "tokyo", "london", "new york"
+        ]
     }
 }
 
+_CITY_AFTER_IN = re.compile(r"\bin\s+([a-z\s]+)")
+_CITY_AFTER_PREP = re.compile(r"weather\s+(in|for|at)\s+([a-z\s]+)")
+_TIME_WORDS = re.compile(r"\b(today|tomorrow|now|right now|this (morning|afternoon|evening|weekend)|on \w+day|"
+                         r"the day after tomorrow|in \w+ days)\b")
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+_IN_DAYS = re.compile(r"\bin\s+(\d+|" + "|".join(_NUMBER_WORDS) + r")\s+days?\b")
+
 # -------------------------------
 # Core HTTP helpers
 # -------------------------------
+_session = None
+_pool = None                # snapshot fetches (may wait on _requests, never on themselves)
+_requests = None            # the "current" half of a snapshot
+_init_lock = threading.Lock()
+
+def _http():
+    """
+    One keep-alive session, a pool for snapshot fetches and one for the
+    request each fetch runs alongside its own, created on first use.
+    """
+    global _session, _pool, _requests
+    with _init_lock:
+        if _session is None:
+            _session = requests.Session()
+            _pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="athena-weather")
+            _requests = ThreadPoolExecutor(max_workers=4, thread_name_prefix="athena-weather-req")
+        return _session, _pool, _requests
+
 def _weatherbit_get(endpoint: str, params: dict) -> dict:
     """
     Simple helper to call Weatherbit API.
@@ -91,10 +185,169 @@ def _weatherbit_get(endpoint: str, params: dict) -> dict:
     params["key"] = API_KEY
 
     url = f"{WEATHERBIT_BASE}/{endpoint}"
-    resp = requests.get(url, params=params, timeout=8)
+    with _snap_lock:
+        _CALLS.append(time.time())
+    resp = _http()[0].get(url, params=params, timeout=HTTP_TIMEOUT)
     resp.raise_for_status()
+    if resp.status_code == 204:         # Weatherbit's answer for a city it doesn't know
+        return {}
     return resp.json()
 
+# -------------------------------
+# Forecast snapshots
+# -------------------------------
+_SNAPSHOTS = {}             # city key -> {"city", "current", "daily", "fetched"}
+_MISSING = {}               # city key -> when Weatherbit last didn't know it
+_INFLIGHT = {}              # city key -> Future of the fetch in progress
+_RECENT = OrderedDict()     # city -> last asked (time.time()), only cities that have a snapshot
+_CALLS = deque()            # when each Weatherbit call in the last 24 hours was made
+_snap_lock = threading.Lock()
+_backoff = {"until": 0.0, "failures": 0}
+_refresher = None
+_stop = threading.Event()
+
+def _key(city):
+    return " ".join(city.lower().split())
+
+def _fetch_snapshot(city):
+    try:
+        session, pool, requests_pool = _http()
+        current = requests_pool.submit(_weatherbit_get, "current", {"city": city})
+        daily = _weatherbit_get("forecast/daily", {"city": city, "days": FORECAST_DAYS})
+        current = current.result(timeout=FETCH_TIMEOUT)
+    except Exception as e:
+        _note_failure(e)
+        raise
+    now = (current.get("data") or [None])[0]
+    days = daily.get("data") or []
+    with _snap_lock:
+        _backoff.update(until=0.0, failures=0)
+        if now is None and not days:
+            _MISSING[_key(city)] = time.time()
+            return None
+        snapshot = _SNAPSHOTS[_key(city)] = {
+            "city": (now or {}).get("city_name") or daily.get("city_name") or city,
+            "current": now, "daily": days, "fetched": time.time()}
+        _MISSING.pop(_key(city), None)
+    return snapshot
+
+def _note_failure(error):
+    """
+    Pause background refreshes: BACKOFF_MIN doubling per consecutive
+    failure, or as long as a 429's Retry-After asks.
+    """
+    response = getattr(error, "response", None)
+    delay = 0.0
+    if response is not None and response.status_code == 429:
+        try:
+            delay = float(response.headers.get("Retry-After", 0))
+        except ValueError:
+            pass
+    with _snap_lock:
+        _backoff["failures"] += 1
+        delay = max(delay, min(BACKOFF_MAX, BACKOFF_MIN * 2 ** (_backoff["failures"] - 1)))
+        _backoff["until"] = time.time() + delay
+
+def _backing_off():
+    return time.time() < _backoff["until"]
+
+def _over_budget():
+    with _snap_lock:
+        while _CALLS and _CALLS[0] < time.time() - 86400:
+            _CALLS.popleft()
+        return len(_CALLS) >= DAILY_CALLS
+
+def _refresh(city):
+    """
+    Future for a fetch of this city, joining one already in flight.
+    """
+    key = _key(city)
+    with _snap_lock:
+        future = _INFLIGHT.get(key)
+        if future is None:
+            future = _INFLIGHT[key] = _http()[1].submit(_fetch_snapshot, city)
+            future.add_done_callback(lambda _f, key=key: _INFLIGHT.pop(key, None))
+    return future
+
+def _asked(city):
+    """
+    Put a city with a snapshot on the refresher's list.
+    """
+    with _snap_lock:
+        _RECENT[city] = time.time()
+        _RECENT.move_to_end(city)
+        while len(_RECENT) > RECENT_CITIES:
+            _RECENT.popitem(last=False)
+    _start_refresher()
+
+def _snapshot(city):
+    """
+    Snapshot for a city: fresh from memory, stale from memory with a
+    background refresh, or fetched now if there's nothing usable.
+    Returns None if Weatherbit knows no such city.
+    """
+    with _snap_lock:
+        snapshot = _SNAPSHOTS.get(_key(city))
+        missing = time.time() - _MISSING.get(_key(city), float("-inf")) < MISSING_TTL
+    if missing:
+        return None
+    age = time.time() - snapshot["fetched"] if snapshot else float("inf")
+    if age > MAX_STALE:
+        try:
+            snapshot = _refresh(city).result(timeout=FETCH_TIMEOUT)
+        except FutureTimeout:
+            raise RuntimeError(f"Weatherbit didn't answer within {FETCH_TIMEOUT}s") from None
+    elif age > SNAPSHOT_TTL and not _backing_off():
+        _refresh(city)
+    if snapshot:
+        _asked(city)
+    return snapshot
+
+def _start_refresher():
+    global _refresher
+    if REFRESH_INTERVAL <= 0:
+        return None
+    with _init_lock:
+        if _refresher and _refresher.is_alive():
+            return _refresher
+
+        def _run():
+            while not _stop.wait(min(60.0, REFRESH_INTERVAL)):
+                if _backing_off() or _over_budget():
+                    continue
+                with _snap_lock:
+                    now = time.time()
+                    for city in [c for c, asked in _RECENT.items() if asked < now - RECENT_WINDOW]:
+                        del _RECENT[city]
+                    due = [c for c in [DEFAULT_CITY, *(c for c in _RECENT if _key(c) != _key(DEFAULT_CITY))]
+                           if now - _SNAPSHOTS.get(_key(c), {}).get("fetched", 0) >= REFRESH_INTERVAL]
+                for city in due:
+                    if _stop.is_set() or _over_budget():
+                        break
+                    try:
+                        _refresh(city).result(timeout=FETCH_TIMEOUT)
+                    except FutureTimeout:
+                        print(f"[WEATHER] ⚠️ Background refresh of {city} timed out")
+                        break
+                    except Exception as e:
+                        print(f"[WEATHER] ⚠️ Background refresh of {city} failed: {e}")
+                        break           # backing off now; the rest wait for the next round
+
+        _stop.clear()
+        _refresher = threading.Thread(target=_run, name="athena-weather-refresh", daemon=True)
+        _refresher.start()
+        return _refresher
+
+def _forecast_day(snapshot, offset):
+    """
+    Daily entry `offset` days from today (0 = today), by valid_date when present.
+    """
+    days = snapshot["daily"]
+    if not any(d.get("valid_date") for d in days):
+        return days[offset] if offset < len(days) else None
+    wanted = (datetime.date.today() + datetime.timedelta(days=offset)).isoformat()
+    return next((d for d in days if d.get("valid_date") == wanted), None)
+
 # -------------------------------
 # Command implementations
 # -------------------------------
@@ -105,88 +358,151 @@ def get_weather_now(city: str = None, **_) -> str:
     """
     city = city or DEFAULT_CITY
     try:
-        data = _weatherbit_get("current", {"city": city})
-        if not data.get("data"):
+        snapshot = _snapshot(city)
+        if not snapshot or not snapshot["current"]:
             return f"I couldn't find weather data for {city}."
 
-        w = data["data"][0]
+        w = snapshot["current"]
 
-        display_city = w.get("city_name") or city
+        display_city = snapshot["city"]
 
         temp = w.get("temp")
         desc = w.get("weather", {}).get("description", "unknown conditions")
         feels = w.get("app_temp")
         return f"It's currently {temp}°C in {display_city}, {desc} (feels like {feels}°C)."
     except Exception as e:
-        return f"Error fetching current weather for {city}: {e}"
+        # raise (not return) so a failed lookup is never served from the result cache
+        raise RuntimeError(f"couldn't fetch current weather for {city}: {e}") from e
 
 def get_weather_tomorrow(city: str = None, **_) -> str:
     """
-    Get daily forecast for tomorrow (day 2) for a city.
+    Get daily forecast for tomorrow for a city.
+    """
+    return get_weather_day(city, 1)
+
+def get_weather_day(city: str = None, day: int = 2, **_) -> str:
+    """
+    Daily forecast `day` days from today (1 = tomorrow), from the snapshot.
     """
     city = city or DEFAULT_CITY
+    day = int(day)
+    if not 0 <= day < FORECAST_DAYS:
+        return f"I only have the forecast for the next {FORECAST_DAYS - 1} days."
     try:
-        data = _weatherbit_get("forecast/daily", {"city": city, "days": 2})
-        if not data.get("data"):
+        snapshot = _snapshot(city)
+        entry = _forecast_day(snapshot, day) if snapshot else None
+        if not entry:
             return f"I couldn't find forecast data for {city}."
 
-        display_city = data.get("city_name") or city
+        display_city = snapshot["city"]
+        max_t = entry.get("max_temp")
+        min_t = entry.get("min_temp")
+        desc = entry.get("weather", {}).get("description", "unknown conditions")
 
-        # index 1 = tomorrow
-        tomorrow = data["data"][1]
-        max_t = tomorrow.get("max_temp")
-        min_t = tomorrow.get("min_temp")
-        desc = tomorrow.get("weather", {}).get("description", "unknown conditions")
-
-        return f"Tomorrow in {display_city}: {desc}, between {min_t}°C and {max_t}°C."
+        when = {0: "Today", 1: "Tomorrow"}.get(day) or \
+            (datetime.date.today() + datetime.timedelta(days=day)).strftime("%A")
+        return f"{when} in {display_city}: {desc}, between {min_t}°C and {max_t}°C."
     except Exception as e:
-        return f"Error fetching forecast for {city}: {e}"
+        raise RuntimeError(f"couldn't fetch the forecast for {city}: {e}") from e
+
+async def prefetch(cmd=None, params=None, **_):
+    """
+    Speculation hook: start fetching the city's snapshot if we don't have
+    a usable one, without waiting for it.
+    """
+    city = (params or {}).get("city") or DEFAULT_CITY
+    with _snap_lock:
+        snapshot = _SNAPSHOTS.get(_key(city))
+        missing = time.time() - _MISSING.get(_key(city), float("-inf")) < MISSING_TTL
+    if missing or _backing_off():
+        return
+    if not snapshot or time.time() - snapshot["fetched"] > SNAPSHOT_TTL:
+        _refresh(city)
+
+def shutdown():
+    """
+    Stop the background refresher and close the HTTP session. The next
+    call creates them again (see _http).
+    """
+    global _session, _pool, _requests, _refresher
+    _stop.set()
+    _refresher = None
+    with _init_lock:
+        if _session is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _requests.shutdown(wait=False, cancel_futures=True)
+            _session.close()
+        _session = _pool = _requests = None
 
 # -------------------------------
 # Param resolution (NO hard-coded list in entity_extractor)
 # -------------------------------
-def resolve_params(text: str, **_) -> dict:
+def resolve_params(text: str, spans=None, **_) -> dict:
     """
     Extracts 'city' from the user text if present.
     Otherwise falls back to DEFAULT_CITY.
 
+    Known cities come from the shared gazetteer spans (TOOL_SPEC
+    vocabulary); anything else is picked up by pattern.
+
     Examples it handles:
       - "what's the weather in sydney"
       - "weather in melbourne tomorrow"
       - "what's the weather right now"
       - "weather here"
 
-    No massive hard-coded city list – just pattern detection.
+    Only a short list of known cities – anything else is pattern detection.
     """
     t = text.lower().strip()
+    out = _resolve_day(t)
+    t = _IN_DAYS.sub(" ", t).strip()        # "in three days" isn't a city
+
+    # 0) A city from the gazetteer
+    known = first(spans, "city")
+    if known:
+        return {**out, "city": " ".join(w.capitalize() for w in known.split())}
 
     # 1) Explicit "in <city>" pattern
     #    e.g. "what's the weather in sydney", "weather tomorrow in melbourne"
-    m = re.search(r"\bin\s+([a-z\s]+)", t)
+    m = _CITY_AFTER_IN.search(t)
     if m:
         raw_city = m.group(1)
         # strip trailing keywords like "today", "tomorrow", "now", etc.
-        raw_city = re.sub(r"\b(today|tomorrow|now|right now|this (morning|afternoon|evening|weekend))\b", "", raw_city)
+        raw_city = _TIME_WORDS.sub("", raw_city)
         raw_city = raw_city.strip()
         if raw_city:
             city = " ".join(w.capitalize() for w in raw_city.split())
-            return {"city": city}
+            return {**out, "city": city}
 
     # 2) "weather in brisbane" / "brisbane weather"
     #    simple fallback for when "in" pattern fails
-    m2 = re.search(r"weather\s+(in|for|at)\s+([a-z\s]+)", t)
+    m2 = _CITY_AFTER_PREP.search(t)
     if m2:
         raw_city = m2.group(2).strip()
         city = " ".join(w.capitalize() for w in raw_city.split())
-        return {"city": city}
+        return {**out, "city": city}
 
-    # 3) If user explicitly mentions "brisbane" anywhere
-    if "brisbane" in t:
-        return {"city": "Brisbane"}
-
-    # 4) Words like "here", "outside" -> interpret as default city
+    # 3) Words like "here", "outside" -> interpret as default city
     if any(word in t for word in ["here", "outside", "right now", "my place"]):
-        return {"city": DEFAULT_CITY}
+        return {**out, "city": DEFAULT_CITY}
+
+    # 4) Fallback: always default city
+    return {**out, "city": DEFAULT_CITY}
 
-    # 5) Fallback: always default city
-    return {"city": DEFAULT_CITY}
+def _resolve_day(t):
+    """
+    "the day after tomorrow" / "in 3 days" / "on friday" / "the weekend" -> {"day": offset from today}.
+    """
+    if "day after tomorrow" in t:
+        return {"day": 2}
+    m = _IN_DAYS.search(t)
+    if m:
+        n = m.group(1)
+        return {"day": int(n) if n.isdigit() else _NUMBER_WORDS[n]}
+    today = datetime.date.today().weekday()
+    for i, name in enumerate(_WEEKDAYS):
+        if re.search(rf"\b{name}\b", t):
+            return {"day": (i - today) % 7}
+    if "weekend" in t:
+        return {"day": (5 - today) % 7}
+    return {}
@@ -0,0 +1,171 @@
+import json
+import os
+import time
+import wave
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2          # 16-bit mono PCM
+FILE_CHUNK = 8000         # bytes fed per AcceptWaveform call when decoding files (0.25 s)
+AUDIO_EXTENSIONS = (".wav", ".raw", ".pcm")
+
+
+def sentence_from_result(result_json):
+    """
+    Turn a KaldiRecognizer Result()/FinalResult() JSON string into the
+    lower-cased sentence the rest of ATHENA works with.
+    """
+    try:
+        text = json.loads(result_json).get("text", "")
+    except (TypeError, ValueError):
+        return ""
+    return text.strip().lower()
+
+
+class UtteranceDecoder:
+    """
+    Wraps one KaldiRecognizer: feed it PCM chunks and it returns a
+    finished sentence whenever Vosk finalises an utterance.
+
+    Used by the live audio worker and by file/batch transcription, so
+    both paths share the exact same decoding and post-processing.
+    """
+
+    def __init__(self, model, rate=SAMPLE_RATE):
+        from vosk import KaldiRecognizer
+        self.recognizer = KaldiRecognizer(model, rate)
+        self.rate = rate
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.audio_seconds = 0.0   # audio fed since the last finished utterance
+        self.decode_seconds = 0.0  # wall time spent inside Vosk for it
+
+    def feed(self, pcm):
+        """
+        Returns the finished sentence ("" if Vosk finalised silence), or
+        None while the utterance is still in progress.
+        """
+        self.audio_seconds += len(pcm) / (SAMPLE_WIDTH * self.rate)
+        t0 = time.perf_counter()
+        done = self.recognizer.AcceptWaveform(pcm)
+        sentence = sentence_from_result(self.recognizer.Result()) if done else None
+        self.decode_seconds += time.perf_counter() - t0
+        return sentence
+
+    def partial(self):
+        """
+        Current in-progress hypothesis ("" if nothing yet).
+        """
+        try:
+            return json.loads(self.recognizer.PartialResult()).get("partial", "").strip().lower()
+        except (TypeError, ValueError):
+            return ""
+
+    def reset(self):
+        self.recognizer.Reset()
+        self.reset_stats()
+
+    def flush(self):
+        """
+        Force out whatever is buffered (end of file / end of stream).
+        """
+        t0 = time.perf_counter()
+        sentence = sentence_from_result(self.recognizer.FinalResult())
+        self.decode_seconds += time.perf_counter() - t0
+        return sentence
+
+    def stats(self):
+        return {"audio_s": self.audio_seconds, "decode_s": self.decode_seconds}
+
+
+class WakeWordGate:
+    """
+    Cheap always-on stage: a KaldiRecognizer restricted to a grammar of
+    just the wake words (plus [unk]), so Vosk decodes against a tiny
+    graph instead of the full language model. feed() returns the wake
+    word as soon as it shows up in a partial or final hypothesis.
+    """
+
+    def __init__(self, model, wake_words, rate=SAMPLE_RATE):
+        from vosk import KaldiRecognizer
+        self.wake_words = [w.lower() for w in wake_words]
+        self.recognizer = KaldiRecognizer(model, rate, json.dumps(self.wake_words + ["[unk]"]))
+
+    def _find(self, text):
+        padded = f" {text} "
+        for word in self.wake_words:
+            if f" {word} " in padded:
+                return word
+        return None
+
+    def feed(self, pcm):
+        if self.recognizer.AcceptWaveform(pcm):
+            word = self._find(sentence_from_result(self.recognizer.Result()))
+        else:
+            try:
+                partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+            except (TypeError, ValueError):
+                partial = ""
+            word = self._find(partial.lower())
+        if word:
+            self.recognizer.Reset()
+        return word
+
+    def reset(self):
+        self.recognizer.Reset()
+
+
+# ----------------------------------------------------------------------
+# Files
+# ----------------------------------------------------------------------
+def read_pcm(path, rate=SAMPLE_RATE):
+    """
+    16-bit mono PCM from a .wav file (checked against rate) or a headerless
+    .raw / .pcm file (assumed to already be in that format).
+    """
+    if not path.lower().endswith(".wav"):
+        with open(path, "rb") as f:
+            return f.read()
+    with wave.open(path, "rb") as w:
+        if w.getnchannels() != 1 or w.getsampwidth() != SAMPLE_WIDTH or w.getframerate() != rate:
+            raise ValueError(f"{path}: need {rate} Hz 16-bit mono, got {w.getframerate()} Hz "
+                             f"{8 * w.getsampwidth()}-bit x{w.getnchannels()}")
+        return w.readframes(w.getnframes())
+
+
+def audio_files(paths):
+    """
+    Expand files and directories (recursively) into a sorted list of audio files.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, n) for n in names if n.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def transcribe_pcm(decoder, pcm, chunk=FILE_CHUNK):
+    """
+    Run a whole recording through an UtteranceDecoder, as the live
+    recognizer would see it. Returns (sentences, {"audio_s", "decode_s"}).
+    """
+    decoder.reset()
+    sentences, audio_s, decode_s = [], 0.0, 0.0
+    for start in range(0, len(pcm), chunk):
+        sentence = decoder.feed(pcm[start:start + chunk])
+        if sentence is not None:
+            if sentence:
+                sentences.append(sentence)
+            audio_s += decoder.audio_seconds
+            decode_s += decoder.decode_seconds
+            decoder.reset_stats()
+    sentence = decoder.flush()
+    if sentence:
+        sentences.append(sentence)
+    audio_s += decoder.audio_seconds
+    decode_s += decoder.decode_seconds
+    decoder.reset()
+    return sentences, {"audio_s": audio_s, "decode_s": decode_s}
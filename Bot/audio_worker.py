@@ -0,0 +1,262 @@
+"""
+Out-of-process audio pipeline for VoiceRecognition.
+
+  capture process     PyAudio -> SharedRingBuffer        (never blocks on anything else)
+  recognizer process  SharedRingBuffer -> Vosk -> queue  ("partial" / "final" utterances)
+  main process        queue -> intent matching / tools
+
+With wake words configured, the recognizer process runs only a
+grammar-restricted WakeWordGate until a wake word is heard. It then
+rewinds the ring by `preroll` seconds (so "athena, lights off" said in
+one breath is decoded whole) and runs the full model for at most
+`wake_window` seconds, or until a command has been recognised.
+
+The microphone is drained by a process that does nothing else, so a slow
+tool call in the main process (or a slow decode) can no longer overflow
+the PyAudio buffer. If the recognizer falls more than one ring-length
+behind, it skips ahead and reports the dropped audio.
+"""
+
+import multiprocessing as mp
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+from asr import SAMPLE_RATE, SAMPLE_WIDTH, UtteranceDecoder, WakeWordGate
+
+
+class SharedRingBuffer:
+    """
+    Single-writer byte ring in shared memory.
+
+    Header: uint64 total bytes ever written (the write cursor), uint64
+    capacity. Readers keep their own cursor, so any number can attach.
+    """
+    HEADER = 16
+
+    def __init__(self, name=None, capacity=None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER + capacity)
+            self.owner = True
+            struct.pack_into("<QQ", self.shm.buf, 0, 0, capacity)
+        else:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:  # Python < 3.13
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.capacity = struct.unpack_from("<Q", self.shm.buf, 8)[0]
+        self._data = self.shm.buf[self.HEADER:self.HEADER + self.capacity]
+
+    def cursor(self):
+        return struct.unpack_from("<Q", self.shm.buf, 0)[0]
+
+    def write(self, data):
+        cap = self.capacity
+        if len(data) > cap:
+            data = data[-cap:]
+        cur = self.cursor()
+        start = cur % cap
+        first = min(len(data), cap - start)
+        self._data[start:start + first] = data[:first]
+        if first < len(data):
+            self._data[:len(data) - first] = data[first:]
+        # publish only after the bytes are in place
+        struct.pack_into("<Q", self.shm.buf, 0, cur + len(data))
+
+    def read(self, pos, max_bytes):
+        """
+        Returns (data, new_pos, dropped_bytes) for a reader at `pos`.
+        """
+        cap = self.capacity
+        while True:
+            cur = self.cursor()
+            dropped = 0
+            if cur - pos > cap:
+                dropped = cur - cap - pos
+                pos = cur - cap
+            n = min(cur - pos, max_bytes)
+            if n <= 0:
+                return b"", pos, dropped
+            start = pos % cap
+            first = min(n, cap - start)
+            data = bytes(self._data[start:start + first])
+            if first < n:
+                data += bytes(self._data[:n - first])
+            # the writer may have lapped us mid-copy; if so, retry from the new tail
+            if self.cursor() - pos <= cap:
+                return data, pos + n, dropped
+
+    def close(self):
+        self._data.release()
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ----------------------------------------------------------------------
+# Worker process entry points (module level so they work with "spawn")
+# ----------------------------------------------------------------------
+def _capture_main(ring_name, rate, frames_per_read, stop_event, out_queue):
+    ring = SharedRingBuffer(ring_name)
+    mic = stream = None
+    try:
+        import pyaudio
+        mic = pyaudio.PyAudio()
+        stream = mic.open(format=pyaudio.paInt16, channels=1, rate=rate, input=True,
+                          frames_per_buffer=frames_per_read * 4)
+        stream.start_stream()
+        while not stop_event.is_set():
+            try:
+                ring.write(stream.read(frames_per_read, exception_on_overflow=False))
+            except OSError as e:
+                if e.errno == -9981:  # Input overflowed
+                    continue
+                raise
+    except Exception as e:
+        out_queue.put(("error", f"audio capture failed: {e}", {}))
+    finally:
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+        if mic is not None:
+            mic.terminate()
+        ring.close()
+
+
+def _recognizer_main(ring_name, model_path, rate, chunk_bytes, stop_event, out_queue,
+                     wake_words=None, wake_window=8.0, preroll=1.5):
+    ring = SharedRingBuffer(ring_name)
+    try:
+        from vosk import Model
+        t0 = time.perf_counter()
+        model = Model(model_path)
+        decoder = UtteranceDecoder(model, rate)
+        gate = WakeWordGate(model, wake_words, rate) if wake_words else None
+        out_queue.put(("ready", "", {"load_s": time.perf_counter() - t0}))
+
+        bytes_per_s = SAMPLE_WIDTH * rate
+        preroll_bytes = int(preroll * rate) * SAMPLE_WIDTH
+        active_until = float("inf") if gate is None else 0.0
+        last_partial = ""
+
+        pos = ring.cursor()  # start live; don't decode whatever was captured during model load
+        while not stop_event.is_set():
+            data, pos, dropped = ring.read(pos, chunk_bytes)
+            if dropped:
+                out_queue.put(("overrun", "", {"dropped_s": dropped / bytes_per_s}))
+            if not data:
+                time.sleep(0.01)
+                continue
+
+            now = time.monotonic()
+            if now >= active_until:
+                if active_until:
+                    # window ran out mid-utterance: take what we have and go back to gating
+                    sentence = decoder.flush()
+                    if sentence:
+                        out_queue.put(("final", sentence, decoder.stats()))
+                    decoder.reset()
+                    gate.reset()
+                    active_until = 0.0
+                word = gate.feed(data)
+                if word is None:
+                    continue
+                out_queue.put(("wake", word, {}))
+                active_until = now + wake_window
+                pos = max(pos - len(data) - preroll_bytes, ring.cursor() - ring.capacity, 0)
+                pos -= pos % SAMPLE_WIDTH
+                decoder.reset()
+                continue
+
+            sentence = decoder.feed(data)
+            if sentence is None:
+                partial = decoder.partial()
+                if partial and partial != last_partial:
+                    out_queue.put(("partial", partial, {}))
+                last_partial = partial
+                continue
+            last_partial = ""
+            if sentence:
+                out_queue.put(("final", sentence, decoder.stats()))
+                if gate is not None:
+                    # a bare wake word keeps the window open for the command that follows
+                    bare_wake = sentence in wake_words
+                    active_until = time.monotonic() + wake_window if bare_wake else 0.0
+                    if not bare_wake:
+                        decoder.reset()
+                        gate.reset()
+                        continue
+            decoder.reset_stats()
+    except Exception as e:
+        out_queue.put(("error", f"speech recognizer failed: {e}", {}))
+    finally:
+        ring.close()
+
+
+class AudioWorker:
+    """
+    Owns the ring buffer, the capture + recognizer processes and the
+    queue of recognised utterances.
+
+    Messages on the queue are (kind, text, stats) with kind one of
+    "ready", "wake", "partial", "final", "overrun" or "error".
+    """
+
+    def __init__(self, model_path, rate=SAMPLE_RATE, frames_per_read=4096, ring_seconds=30,
+                 wake_words=None, wake_window=8.0):
+        self.model_path = model_path
+        self.wake_words = [w.lower() for w in wake_words] if wake_words else None
+        self.wake_window = wake_window
+        self.rate = rate
+        self.frames_per_read = frames_per_read
+        self.ring_bytes = int(ring_seconds * rate) * SAMPLE_WIDTH
+        self._ctx = mp.get_context("spawn")
+        self.messages = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self._procs = []
+        self.ring = None
+
+    def start(self):
+        if self._procs:
+            return
+        self._stop.clear()
+        self.ring = SharedRingBuffer(capacity=self.ring_bytes)
+        chunk_bytes = self.frames_per_read * SAMPLE_WIDTH
+        self._procs = [
+            self._ctx.Process(target=_capture_main, name="athena-audio-capture", daemon=True,
+                              args=(self.ring.name, self.rate, self.frames_per_read, self._stop, self.messages)),
+            self._ctx.Process(target=_recognizer_main, name="athena-asr", daemon=True,
+                              args=(self.ring.name, self.model_path, self.rate, chunk_bytes, self._stop, self.messages,
+                                    self.wake_words, self.wake_window)),
+        ]
+        for p in self._procs:
+            p.start()
+
+    def alive(self):
+        return bool(self._procs) and all(p.is_alive() for p in self._procs)
+
+    def get(self, timeout=None):
+        """
+        Next (kind, text, stats) message, or None on timeout.
+        """
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self, timeout=3):
+        self._stop.set()
+        for p in self._procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -1,27 +1,98 @@
 # bot.py
+import os
 import random
-from multi_stage_processor import MultiStageProcessor
-from voice_recognition import create_voice_recognition
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import METRICS
 import Tools.welcome
 
+MODES = ("voice", "text", "telegram", "server")
+
+
 class Bot:
-    def __init__(self):
+    """
+    Subsystems start in the background so the banner and mode prompt show
+    straight away: the processor (matcher index, tools) is built on a
+    startup thread from __init__, and the speech model is only loaded
+    once voice mode is picked - concurrently with the processor if that
+    is still building. `processor` / `voice_recognition` wait for their
+    subsystem on first use. With mode="voice" (or ATHENA_MODE=voice) the
+    model starts loading immediately, behind the banner.
+
+    voice=False never loads a speech model (chat adapters).
+    """
+
+    def __init__(self, voice=True, mode=None):
+        self._started = time.perf_counter()
+        self.startup_times = {}     # subsystem -> seconds
+        self.tool_watcher = None    # set by _build_processor on the startup thread
+        self.voice = voice
+        self.mode = mode or os.environ.get("ATHENA_MODE")
+        self._voice = None
+        self.active = True
+
+        # ATHENA_METRICS_FILE=metrics.prom (or .json) keeps a snapshot on disk
+        metrics_file = os.environ.get("ATHENA_METRICS_FILE")
+        self._metrics_export = METRICS.export_periodically(metrics_file) if metrics_file else None
+
+        # every attribute exists before startup work that may assign them runs
+        self._startup = ThreadPoolExecutor(max_workers=2, thread_name_prefix="athena-startup")
+        self._processor = self._startup.submit(self._timed, "processor", self._build_processor)
+        if self.mode == "voice":
+            self.start_voice()
+
+    # ---------------- startup ----------------
+    def _timed(self, name, build):
+        t0 = time.perf_counter()
         try:
-            self.processor = MultiStageProcessor()
+            return build()
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.startup_times[name] = elapsed
+            METRICS.observe("athena_startup_seconds", elapsed, subsystem=name)
+
+    def _build_processor(self):
+        try:
+            from multi_stage_processor import MultiStageProcessor
+            processor = MultiStageProcessor()
         except Exception as e:
             print(f"[Bot] Failed to initialize processor: {e}")
-            self.processor = None
+            return None
+        # pick up edits to tools.json / tool modules without a restart
+        from tool_watcher import ToolWatcher
+        self.tool_watcher = ToolWatcher(processor).start()
+        return processor
 
-        self.active = True
-        self.voice_recognition = create_voice_recognition()
+    def start_voice(self):
+        """
+        Start loading the speech model in the background (once).
+        """
+        if self.voice and self._voice is None:
+            from voice_recognition import create_voice_recognition
+            self._voice = self._startup.submit(self._timed, "voice", create_voice_recognition)
+        return self._voice
 
-    def receive_input(self, input_text):
+    @property
+    def processor(self):
+        return self._processor.result()
+
+    @property
+    def voice_recognition(self):
+        return self._voice.result() if self._voice is not None else None
+
+    def report_startup(self):
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.startup_times.items())
+        print(f"[Bot] Startup: {parts or 'nothing loaded'}; ready {time.perf_counter() - self._started:.2f}s after launch")
+
+    def receive_input(self, input_text, session=None):
         if not input_text.strip():
             return "ATHENA: I didn't catch that. Could you please repeat?"
         if not self.processor:
             return "ATHENA: Core processor not initialized."
         try:
-            response, continue_conversation = self.processor.process_query(input_text)
+            response, continue_conversation = self.processor.process_query(input_text, session)
             return response
         except Exception as e:
             return f"ATHENA: There was an error processing your request: {e}"
@@ -30,7 +101,8 @@ class Bot:
         welcome_message = random.choice([Tools.welcome.Hello_Name, Tools.welcome.Hello_sir])
         welcome_message()
 
-        control_method = input("Would you like to use voice control, text control, or Telegram control? (Enter 'voice', 'text', or 'telegram'): ").strip().lower()
+        control_method = self.mode if self.mode in MODES else input("Would you like to use voice control, text control, Telegram control, or server mode? (Enter 'voice', 'text', 'telegram', or 'server'): ").strip().lower()
+        self.mode = None
 
         if control_method == 'voice':
             self.run_voice_control()
@@ -38,20 +110,37 @@ class Bot:
             self.run_text_control()
         elif control_method == 'telegram':
             self.run_telegram_control()
+        elif control_method == 'server':
+            self.run_server()
         else:
-            print("Invalid input. Please enter 'voice', 'text', or 'telegram'.")
+            print("Invalid input. Please enter 'voice', 'text', 'telegram', or 'server'.")
             self.run()
 
     def run_voice_control(self):
+        self.start_voice()
+        processor = self.processor
+        try:
+            voice_recognition = self.voice_recognition
+        except Exception as e:
+            print(f"[Bot] Voice recognition unavailable: {e}")
+            return self.run_text_control()
+        if voice_recognition is None:
+            print("[Bot] Voice recognition is disabled for this bot.")
+            return self.run_text_control()
+        self.report_startup()
         print("Voice control activated. Speak a command to start...")
         while self.active:
-            user_input = self.voice_recognition.listen()
+            user_input = voice_recognition.listen(
+                on_partial=processor.speculate if processor else None)
             if user_input == "END_SESSION":
                 self.active = False
             elif user_input:
                 print(self.receive_input(user_input))
+        self.shutdown()
 
     def run_text_control(self):
+        self.processor      # wait for the index before the first prompt
+        self.report_startup()
         print("Text control activated. Type something to start...")
         while self.active:
             user_input = input("You: ").strip()
@@ -59,14 +148,48 @@ class Bot:
                 self.active = False
             elif user_input:
                 print(self.receive_input(user_input))
+        self.shutdown()
+
+    def run_server(self, host="127.0.0.1", port=8765):
+        if not self.processor:
+            print("ATHENA: Core processor not initialized.")
+            return
+        self.report_startup()
+        from server import run_server
+        run_server(self.processor, host, port)
+        self.shutdown()
+
+    def shutdown(self):
+        if self._metrics_export:
+            self._metrics_export.set()
+        self._startup.shutdown(wait=True)
+        if self.tool_watcher:
+            self.tool_watcher.stop()
+        if self.processor:
+            self.processor.close()
+        if self._voice is not None and self._voice.exception() is None and self._voice.result():
+            self._voice.result().close()
 
     # def run_telegram_control(self):
     #     from Tools.telegram_bot import run_telegram_bot
     #     run_telegram_bot(self)
 
-def process_input_from_telegram(input_text):
-    bot = Bot()
-    return bot.receive_input(input_text)
+_shared_bot = None
+_shared_lock = threading.Lock()
+
+
+def process_input_from_telegram(input_text, session_id=None):
+    """
+    Chat adapters share one text-only Bot (one processor, no microphone);
+    pass the chat id as session_id so users don't fill each other's slots.
+    """
+    global _shared_bot
+    with _shared_lock:
+        if _shared_bot is None:
+            _shared_bot = Bot(voice=False)
+    session = None if session_id is None else f"telegram:{session_id}"
+    return _shared_bot.receive_input(input_text, session)
 
 if __name__ == '__main__':
-    Bot().run()
+    # python bot.py [voice|text|telegram|server] skips the prompt (and starts loading the speech model now)
+    Bot(mode=sys.argv[1] if len(sys.argv) > 1 else None).run()
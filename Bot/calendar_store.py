@@ -0,0 +1,208 @@
+"""
+Local, date-indexed copy of a Google Calendar, kept current with the
+Calendar API's incremental sync.
+
+  - first sync lists events (expanded to single instances) from a week
+    back, page by page, and keeps the nextSyncToken of the last page
+  - later syncs send only that token and get back what changed since,
+    including cancellations, which are applied to the store
+  - a 410 Gone (token expired) throws the store away and does a full sync
+
+Events are indexed by local date, so "what's on today / this week" is a
+couple of dict lookups. The store is persisted as JSON between runs.
+
+The API call is injected as list_events(**params) -> response dict, so
+any object with the events.list shape (googleapiclient service, a fake)
+works.
+"""
+
+import datetime as dt
+import json
+import os
+import threading
+import time
+
+FULL_SYNC_DAYS_BACK = 7
+MAX_SPAN_DAYS = 31      # multi-day events are indexed on at most this many dates
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+def is_gone(error):
+    """
+    True for the API's 410 Gone (sync token no longer valid).
+    """
+    if isinstance(error, SyncTokenExpired):
+        return True
+    resp = getattr(error, "resp", None)               # googleapiclient.errors.HttpError
+    status = getattr(resp, "status", None) or getattr(error, "status_code", None)
+    return str(status) == "410"
+
+
+class CalendarStore:
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.events = {}        # id -> {"id", "summary", "start", "end", "all_day", "location"}
+        self.by_date = {}       # "YYYY-MM-DD" -> [event ids sorted by start]
+        self.sync_token = None
+        self.synced_at = 0.0
+        self.load()
+
+    # ---------------- disk ----------------
+    def load(self):
+        if not self.path:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        with self._lock:
+            self.events = data.get("events", {})
+            self.sync_token = data.get("sync_token")
+            self.synced_at = data.get("synced_at", 0.0)
+            self._reindex()
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            blob = json.dumps({"sync_token": self.sync_token, "synced_at": self.synced_at, "events": self.events})
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[CALENDAR] ⚠️ Could not write event store: {e}")
+
+    # ---------------- queries (local only) ----------------
+    def on(self, day):
+        """
+        Events on a date (datetime.date), sorted by start.
+        """
+        ids = self.by_date.get(day.isoformat(), ())
+        events = self.events
+        return [events[i] for i in ids if i in events]
+
+    def between(self, first, last):
+        """
+        {date: [events]} for every date in first..last (inclusive) that has events.
+        """
+        out = {}
+        day = first
+        while day <= last:
+            events = self.on(day)
+            if events:
+                out[day] = events
+            day += dt.timedelta(days=1)
+        return out
+
+    def age(self):
+        return time.time() - self.synced_at if self.synced_at else float("inf")
+
+    # ---------------- sync ----------------
+    def sync(self, list_events, calendar_id="primary"):
+        """
+        Incremental sync when we have a token, full sync otherwise (or
+        after a 410). Returns {"mode", "changed", "events", "seconds"}.
+        """
+        with self._sync_lock:
+            t0 = time.perf_counter()
+            mode = "incremental" if self.sync_token else "full"
+            try:
+                changes, token = self._fetch(list_events, calendar_id, self.sync_token)
+            except Exception as e:
+                if not self.sync_token or not is_gone(e):
+                    raise
+                print("[CALENDAR] Sync token expired; doing a full sync.")
+                mode = "full"
+                changes, token = self._fetch(list_events, calendar_id, None)
+
+            with self._lock:
+                if mode == "full":
+                    self.events = {}
+                for item in changes:
+                    if item.get("status") == "cancelled":
+                        self.events.pop(item.get("id"), None)
+                    else:
+                        event = _event(item)
+                        if event:
+                            self.events[event["id"]] = event
+                self.sync_token = token
+                self.synced_at = time.time()
+                self._reindex()
+                count = len(self.events)
+            self.save()
+            return {"mode": mode, "changed": len(changes), "events": count, "seconds": time.perf_counter() - t0}
+
+    def _fetch(self, list_events, calendar_id, sync_token):
+        params = {"calendarId": calendar_id, "singleEvents": True, "maxResults": 250}
+        if sync_token:
+            params["syncToken"] = sync_token
+            params["showDeleted"] = True
+        else:
+            since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=FULL_SYNC_DAYS_BACK)
+            params["timeMin"] = since.isoformat().replace("+00:00", "Z")
+
+        items, page_token = [], None
+        while True:
+            response = list_events(**params, **({"pageToken": page_token} if page_token else {}))
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return items, response.get("nextSyncToken")
+
+    def _reindex(self):
+        by_date = {}
+        for event in sorted(self.events.values(), key=lambda e: (e["start"], e["id"])):
+            for day in _dates(event):
+                by_date.setdefault(day, []).append(event["id"])
+        self.by_date = by_date
+
+
+def _parse(when):
+    """
+    API start/end ({"date"} or {"dateTime"}) -> (local datetime, all_day).
+    """
+    if "dateTime" in when:
+        value = dt.datetime.fromisoformat(when["dateTime"].replace("Z", "+00:00"))
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        return value, False
+    return dt.datetime.fromisoformat(when["date"]), True
+
+
+def _event(item):
+    if not item.get("id") or not item.get("start"):
+        return None
+    start, all_day = _parse(item["start"])
+    end, _ = _parse(item.get("end") or item["start"])
+    return {
+        "id": item["id"],
+        "summary": item.get("summary") or "(no title)",
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "all_day": all_day,
+        "location": item.get("location"),
+    }
+
+
+def _dates(event):
+    """
+    Local dates an event covers (all-day end dates are exclusive).
+    """
+    start = dt.datetime.fromisoformat(event["start"])
+    end = dt.datetime.fromisoformat(event["end"])
+    last = (end - dt.timedelta(microseconds=1)).date() if end > start else start.date()
+    day = start.date()
+    out = []
+    while day <= last and len(out) < MAX_SPAN_DAYS:
+        out.append(day.isoformat())
+        day += dt.timedelta(days=1)
+    return out
@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from index_cache import content_hash, load_index, save_index, vectorizer_settings
+from sparse_matcher import InvertedIndexMatcher
+
+VECTORIZER_PARAMS = {"ngram_range": (1, 2)}
+
+
+class CommandIndex:
+    """
+    One immutable snapshot of the command matcher: example rows, the
+    fitted vectorizer, the L2-normalized example matrix, its inverted
+    index, the exact-text table and a memo of resolved utterances.
+
+    The processor swaps in a whole new snapshot when tools are reloaded.
+    A query holds on to the snapshot it started with, so it never sees a
+    half-updated index, and memo entries die with their snapshot.
+    """
+
+    def __init__(self, rows, vectorizer, matrix, memo_size=512):
+        self.rows = rows                                    # [(intent, cmd, func, prepped example)]
+        self.index = [(intent, cmd, func) for intent, cmd, func, _ in rows]
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.matcher = InvertedIndexMatcher(matrix) if matrix is not None else None
+
+        self.exact = {}                                     # prepped example -> row
+        for row, (_, _, _, text) in enumerate(rows):
+            self.exact.setdefault(text, row)
+        self.memo_size = memo_size
+        self.memo = OrderedDict()                           # prepped utterance -> (intent, cmd, func, score)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls, rows, cache_dir=None, memo_size=512):
+        """
+        Fit from scratch, or load the fitted index from the on-disk cache
+        when the examples haven't changed.
+        """
+        if not rows:
+            print("[MSP] ⚠️ No command examples found. Processor disabled.")
+            return cls([], None, None, memo_size)
+
+        examples = [text for _, _, _, text in rows]
+        labels = [[intent, cmd] for intent, cmd, _, _ in rows]
+        key = content_hash(vectorizer_settings(TfidfVectorizer(**VECTORIZER_PARAMS)), examples, labels)
+        cached = load_index(cache_dir, "commands", key, VECTORIZER_PARAMS)
+        if cached and cached[2].get("labels") == labels:
+            vectorizer, matrix, _ = cached
+            print(f"[MSP] ✅ Loaded {len(examples)} example commands from index cache.")
+        else:
+            vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+            matrix = vectorizer.fit_transform(examples)
+            save_index(cache_dir, "commands", key, vectorizer, matrix, {"labels": labels})
+            print(f"[MSP] ✅ Loaded {len(examples)} example commands from tools.")
+        return cls(rows, vectorizer, matrix, memo_size)
+
+    def updated(self, rows, cache_dir=None, max_churn=0.25):
+        """
+        Snapshot for a new set of rows, reusing this one where possible.
+
+        Rows whose example text is already indexed keep their matrix row;
+        only new texts are transformed with the current vectorizer. The
+        vectorizer is refit (via build) when a new example contains a word
+        it has never seen - it would be invisible to the matcher - or when
+        more than max_churn of the examples changed, since IDF weights
+        drift with the corpus.
+
+        Returns (snapshot, {"added", "removed", "refit"}).
+        """
+        old_rows = {}
+        for row, (_, _, _, text) in enumerate(self.rows):
+            old_rows.setdefault(text, row)
+        new_texts = {text for _, _, _, text in rows}
+        added = sorted(new_texts - old_rows.keys())
+        removed = len(old_rows.keys() - new_texts)
+        info = {"added": len(added), "removed": removed, "refit": False}
+
+        churn = (len(added) + removed) / max(1, len(old_rows))
+        if self.vectorizer is None or not rows or churn > max_churn or self._unseen_words(added):
+            info["refit"] = True
+            return CommandIndex.build(rows, cache_dir, self.memo_size), info
+
+        # rows of [old matrix; transformed new texts], picked in the new order
+        source = sp.csr_matrix(self.matrix)
+        if added:
+            source = sp.vstack([source, self.vectorizer.transform(added)], format="csr")
+        fresh = {text: source.shape[0] - len(added) + i for i, text in enumerate(added)}
+        order = [old_rows[text] if text in old_rows else fresh[text] for _, _, _, text in rows]
+        return CommandIndex(rows, self.vectorizer, source[order], self.memo_size), info
+
+    def _unseen_words(self, texts):
+        vocabulary = self.vectorizer.vocabulary_
+        analyze = self.vectorizer.build_analyzer()
+        return any(gram not in vocabulary for text in texts for gram in analyze(text) if " " not in gram)
+
+    # ---------------- memo ----------------
+    def lookup(self, key):
+        """
+        ("exact" | "memo", (intent, cmd, func, score)) or (None, None).
+        """
+        with self.lock:
+            row = self.exact.get(key)
+            if row is not None:
+                return "exact", (*self.index[row], 1.0)
+            hit = self.memo.get(key)
+            if hit is not None:
+                self.memo.move_to_end(key)
+                return "memo", hit
+            return None, None
+
+    def remember(self, key, result):
+        with self.lock:
+            self.memo[key] = result
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
@@ -0,0 +1,297 @@
+"""
+The WiZ bulbs on the LAN, as one map of name -> MAC -> IP. Bulbs are
+named in config/devices.json (hand-edited, tracked); what discovery
+learns at runtime (MACs, moved addresses, bulbs nobody has named yet) is
+kept next to it in config/.devices_state.json (untracked) and laid over
+it on load. The lights tool reads addresses from the map; the gazetteer,
+Tools.lights.resolve_params and entity_extractor read device names (and
+aliases) from it, so a bulb is named in exactly one place.
+
+Addresses come from UDP discovery: one "registration" message is sent to
+the broadcast address (re-sent every RESEND seconds, it's UDP) and every
+bulb that answers reports its MAC. A scan is bounded by a timeout, or
+ends early once every bulb we were looking for has answered, so finding
+dozens of bulbs costs one socket and at most `timeout` seconds.
+
+  - startup: the saved map is used as is, without touching the network.
+    The first time the lights tool needs a bulb, bulbs named by IP only
+    are asked for their MAC in the background (learn_in_background), so
+    they can be found again if they move
+  - a bulb stops answering (DHCP moved it): rediscover() scans for those
+    MACs and updates their addresses. A bulb whose MAC we never learned is
+    rebound to the one unknown MAC that answered, if that's unambiguous
+  - a bulb nobody has named yet is added as "light <last 4 of MAC>"
+
+For testing with simulated bulbs on loopback addresses:
+    ATHENA_WIZ_BROADCAST=127.0.0.2,127.0.0.3  ATHENA_WIZ_PORT=38999
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+WIZ_PORT = int(os.environ.get("ATHENA_WIZ_PORT", "38899"))
+BROADCAST = os.environ.get("ATHENA_WIZ_BROADCAST", "255.255.255.255")   # comma-separated targets allowed
+DEVICES_PATH = os.environ.get("ATHENA_DEVICES",
+                              str(Path(__file__).resolve().parents[1] / "config" / "devices.json"))
+RESEND = 0.3
+REGISTRATION = json.dumps({"method": "registration", "params": {
+    "phoneMac": "AAAAAAAAAAAA", "register": False, "phoneIp": "1.2.3.4", "id": "1"}}).encode()
+
+
+def _mac(value):
+    return (value or "").replace(":", "").lower() or None
+
+
+class _Listener(asyncio.DatagramProtocol):
+    def __init__(self, found, wanted, wanted_ips, done):
+        self.found = found
+        self.wanted = wanted
+        self.wanted_ips = wanted_ips
+        self.done = done
+
+    def datagram_received(self, data, addr):
+        try:
+            mac = _mac(json.loads(data.decode()).get("result", {}).get("mac"))
+        except (ValueError, AttributeError):
+            return
+        if mac:
+            self.found[mac] = addr[0]
+            complete = (self.wanted and self.wanted <= self.found.keys()) or \
+                (self.wanted_ips and self.wanted_ips <= set(self.found.values()))
+            if complete and not self.done.done():
+                self.done.set_result(None)
+
+    def error_received(self, exc):
+        pass
+
+
+class DeviceRegistry:
+    def __init__(self, path=DEVICES_PATH, port=WIZ_PORT, broadcast=BROADCAST, state_path=None):
+        self.path = path
+        # devices.json -> .devices_state.json next to it
+        self.state_path = state_path or str(Path(path).with_name(f".{Path(path).stem}_state.json"))
+        self.port = port
+        self.targets = [t.strip() for t in broadcast.split(",") if t.strip()]
+        self._lock = threading.Lock()
+        self._learner = None
+        self.devices = {}       # name -> {"name", "mac", "ip", "aliases", "seen", "configured_ip"}
+        self.version = 0        # bumped whenever the set of names changes
+        self.load()
+
+    # ---------------- disk ----------------
+    def load(self):
+        """
+        The named bulbs from devices.json, with what discovery learned
+        (state file) laid over them. A learned address only applies while
+        devices.json still has the address it was learned from.
+        """
+        entries = self._read(self.path) or []
+        state = self._read(self.state_path) or []
+        with self._lock:
+            self.devices = {}
+            for entry in entries:
+                if entry.get("name"):
+                    name = entry["name"].strip().lower()
+                    self.devices[name] = {"name": name, "mac": _mac(entry.get("mac")), "ip": entry.get("ip"),
+                                          "aliases": entry.get("aliases", []), "seen": None,
+                                          "configured_ip": entry.get("ip")}
+            for entry in state:
+                name = (entry.get("name") or "").strip().lower()
+                device = self.devices.get(name)
+                if device is None:          # found by discovery, not named in devices.json
+                    if name:
+                        self.devices[name] = {"name": name, "mac": _mac(entry.get("mac")), "ip": entry.get("ip"),
+                                              "aliases": [], "seen": entry.get("seen"), "configured_ip": None}
+                    continue
+                if device["mac"] and device["mac"] != _mac(entry.get("mac")):
+                    continue                # MAC edited by hand since
+                if entry.get("configured_ip") != device["configured_ip"]:
+                    continue                # address edited by hand since
+                device.update(mac=device["mac"] or _mac(entry.get("mac")), ip=entry.get("ip") or device["ip"],
+                              seen=entry.get("seen"))
+            self.version += 1
+        return bool(entries or state)
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[DEVICES] ⚠️ Could not read {path}: {e}")
+            return None
+
+    def save(self):
+        """
+        Persist what discovery learned to the state file; devices.json is
+        never written.
+        """
+        with self._lock:
+            blob = json.dumps([{k: d[k] for k in ("name", "mac", "ip", "seen", "configured_ip")}
+                               for d in self.devices.values()], indent=2)
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"[DEVICES] ⚠️ Could not write {self.state_path}: {e}")
+
+    # ---------------- lookups ----------------
+    def names(self):
+        return list(self.devices)
+
+    def ip(self, name):
+        device = self.devices.get(name)
+        return device["ip"] if device else None
+
+    def items(self):
+        """
+        [(name, ip)] for every bulb with a known address.
+        """
+        return [(name, d["ip"]) for name, d in self.devices.items() if d["ip"]]
+
+    def vocabulary(self):
+        """
+        Gazetteer vocabulary for the device names: {"device": {name: [phrases]}}.
+        """
+        return {"device": {name: [name, *d["aliases"]] for name, d in self.devices.items()}}
+
+    # ---------------- discovery ----------------
+    async def scan(self, timeout=1.0, wanted=None, targets=None):
+        """
+        Send a registration to `targets` (default: the broadcast address)
+        and collect {mac: ip} from the bulbs that answer within `timeout`
+        (sooner if every MAC in `wanted`, or every unicast target, answered).
+        """
+        loop = asyncio.get_running_loop()
+        found, done = {}, loop.create_future()
+        wanted_ips = set(targets or ())
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _Listener(found, set(wanted or ()), wanted_ips, done),
+            local_addr=("0.0.0.0", 0), allow_broadcast=True)
+        try:
+            deadline = loop.time() + timeout
+            while not done.done() and loop.time() < deadline:
+                for target in targets or self.targets:
+                    transport.sendto(REGISTRATION, (target, self.port))
+                try:
+                    await asyncio.wait_for(asyncio.shield(done), min(RESEND, max(0.0, deadline - loop.time())))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            transport.close()
+        return found
+
+    async def discover(self, timeout=1.0):
+        """
+        Full scan: refresh every address and add bulbs we haven't seen.
+        Returns {"found", "moved", "added"}.
+        """
+        found = await self.scan(timeout)
+        return self._apply_scan(found)
+
+    async def learn_macs(self, timeout=1.0):
+        """
+        Ask every bulb that has an address but no MAC (named by IP in
+        devices.json) for its MAC, one unicast registration each.
+        """
+        ips = [d["ip"] for d in self.devices.values() if d["ip"] and not d["mac"]]
+        if not ips:
+            return {}
+        found = await self.scan(timeout, targets=ips)
+        if found:
+            self._apply_scan(found, complete=False)
+        return found
+
+    def learn_in_background(self, timeout=1.0):
+        """
+        learn_macs on a daemon thread (once per process), so the command
+        that started it doesn't wait on the network.
+        """
+        with self._lock:
+            if self._learner or not any(d["ip"] and not d["mac"] for d in self.devices.values()):
+                return None
+
+            def _run():
+                try:
+                    asyncio.run(self.learn_macs(timeout))
+                except Exception as e:
+                    print(f"[DEVICES] ⚠️ Could not learn bulb MACs: {e}")
+
+            self._learner = threading.Thread(target=_run, name="athena-devices-learn", daemon=True)
+        self._learner.start()
+        return self._learner
+
+    async def rediscover(self, names, timeout=1.0):
+        """
+        Find new addresses for the named bulbs only (the ones that stopped
+        answering). Returns {name: ip} for those that were found.
+        """
+        devices = [self.devices[n] for n in names if n in self.devices]
+        if not devices:
+            return {}
+        before = {d["name"]: d["ip"] for d in devices}
+        wanted = {d["mac"] for d in devices if d["mac"]}
+        # a bulb without a MAC can only be recognised once everyone has answered: no early exit
+        complete = len(wanted) < len(devices)
+        found = await self.scan(timeout, None if complete else wanted)
+        self._apply_scan(found, complete, quiet=True)
+        moved = {name: self.devices[name]["ip"] for name in before
+                 if name in self.devices and self.devices[name]["ip"] != before[name]}
+        if moved:
+            print(f"[DEVICES] Rediscovered {', '.join(f'{n} at {ip}' for n, ip in moved.items())}")
+        return moved
+
+    def _apply_scan(self, found, complete=True, quiet=False):
+        """
+        Update the map from a scan's {mac: ip}. Only a complete scan (every
+        bulb had the whole timeout to answer) rebinds or adds bulbs.
+        """
+        moved, added = [], []
+        with self._lock:
+            by_mac = {d["mac"]: d for d in self.devices.values() if d["mac"]}
+            by_ip = {d["ip"]: d for d in self.devices.values() if d["ip"] and not d["mac"]}
+            answered = set(found.values())
+            unknown = []
+            for mac, ip in found.items():
+                device = by_mac.get(mac) or by_ip.get(ip)      # a hand-entered bulb gets its MAC on first sight
+                if device is None:
+                    unknown.append((mac, ip))
+                    continue
+                if device["ip"] != ip:
+                    moved.append(device["name"])
+                device.update(mac=mac, ip=ip, seen=time.time())
+
+            # a bulb named by IP only, silent at that IP, is the one unknown MAC that answered
+            stale = [d for d in self.devices.values() if not d["mac"] and d["ip"] not in answered]
+            if not complete:
+                unknown = []
+            elif len(stale) == 1 and len(unknown) == 1:
+                (mac, ip), device = unknown.pop(), stale[0]
+                device.update(mac=mac, ip=ip, seen=time.time())
+                moved.append(device["name"])
+            elif stale and unknown:
+                print(f"[DEVICES] ⚠️ Can't tell which of {', '.join(d['name'] for d in stale)} moved; "
+                      f"add their MACs to {self.path}")
+
+            for mac, ip in unknown:
+                name = f"light {mac[-4:]}"
+                self.devices[name] = {"name": name, "mac": mac, "ip": ip, "aliases": [], "seen": time.time(),
+                                      "configured_ip": None}
+                added.append(name)
+            if added:
+                self.version += 1
+        if found:
+            self.save()
+        if not quiet:
+            print(f"[DEVICES] Discovery: {len(found)} bulbs answered, {len(moved)} moved, {len(added)} new")
+        return {"found": len(found), "moved": moved, "added": added}
+
+
+DEVICES = DeviceRegistry()
@@ -1,23 +1,46 @@
 import re
+from gazetteer import Gazetteer, blank, first
+from device_registry import DEVICES
 
-def extract_entities(text):
+NUMBER_RE = re.compile(r'(\d+)\s?%?')
+
+# Used only when no spans are passed in (standalone use); the processor
+# passes spans from the gazetteer built out of every tool's vocabulary.
+# Device names come from the device registry (config/devices.json).
+DEFAULT_VOCABULARY = {
+    "color_temp": {"warm": ["warmer"], "cool": ["cooler", "colder"]},
+}
+_default_gazetteer = None
+_default_version = None
+
+
+def default_gazetteer():
+    global _default_gazetteer, _default_version
+    if _default_gazetteer is None or _default_version != DEVICES.version:
+        _default_version = DEVICES.version
+        _default_gazetteer = Gazetteer.from_vocabulary(DEFAULT_VOCABULARY, DEVICES.vocabulary())
+    return _default_gazetteer
+
+
+def extract_entities(text, spans=None):
     """Simple rule-based entity extractor for ATHENA hybrid memory."""
     entities = {}
+    if spans is None:
+        spans = default_gazetteer().find(text)
 
     # Detect brightness
-    brightness_match = re.search(r'(\d+)\s?%?', text)
+    brightness_match = NUMBER_RE.search(blank(text, spans, "device"))
     if brightness_match:
         entities["brightness"] = int(brightness_match.group(1))
 
     # Detect color temperature hints
-    if "warmer" in text:
-        entities["color_temp"] = "warm"
-    elif "cooler" in text or "colder" in text:
-        entities["color_temp"] = "cool"
-
-    # Detect device names (match partials)
-    for name in ["mushroom light", "top lamp light", "middle lamp light", "bottom lamp light"]:
-        if name in text:
-            entities["device"] = name
+    color_temp = first(spans, "color_temp")
+    if color_temp:
+        entities["color_temp"] = color_temp
+
+    # Detect device names ("all" is left to the tool's own defaults)
+    devices = [s.value for s in spans if s.label == "device" and s.value != "all"]
+    if devices:
+        entities["device"] = devices[-1]
 
     return entities
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """
+    A single long-lived asyncio event loop running on a daemon thread.
+
+    Sync callers (Bot.receive_input, the text/voice loops) hand coroutines
+    to it with run(), so async tools always execute on the same loop and
+    can keep sockets / transports alive between commands.
+    """
+
+    def __init__(self, name="athena-loop"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self.loop
+            ready = threading.Event()
+
+            def _run():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+                ready.set()
+                self.loop.run_forever()
+                # run_forever returned: drain what's left, then close
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+                self.loop.close()
+
+            self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            return self.loop
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop and return a concurrent.futures.Future.
+        """
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the loop and block until it finishes.
+        """
+        if self.running and threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("BackgroundLoop.run() called from its own loop thread; await instead.")
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout=5):
+        with self._lock:
+            if not self.running:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,149 @@
+from collections import deque, namedtuple
+
+Span = namedtuple("Span", "start end label value text")
+
+
+class Gazetteer:
+    """
+    Aho-Corasick automaton over every phrase tools register (device
+    names, colour words, cities, ...). find() walks the utterance once and
+    returns all entity spans, whatever the number of phrases.
+
+    Phrases are matched case-insensitively on whole words; a trailing
+    plural "s" is tolerated ("mushroom lights" -> "mushroom light").
+    Overlaps are resolved leftmost-longest.
+    """
+
+    def __init__(self):
+        self._goto = [{}]       # state -> {char: state}
+        self._fail = [0]
+        self._out = [[]]        # state -> [(length, label, value)]
+        self._built = True
+        self.size = 0
+
+    @classmethod
+    def from_vocabulary(cls, *vocabularies):
+        """
+        vocabulary = {label: [phrase, ...]}  (value = phrase)
+                  or {label: {value: [phrase, ...]}}
+        Several vocabularies are merged into one automaton.
+        """
+        gaz = cls()
+        for vocabulary in vocabularies:
+            for label, entries in (vocabulary or {}).items():
+                if isinstance(entries, dict):
+                    for value, phrases in entries.items():
+                        for phrase in ([phrases] if isinstance(phrases, str) else phrases):
+                            gaz.add(phrase, label, value)
+                else:
+                    for phrase in entries:
+                        gaz.add(phrase, label)
+        gaz.build()
+        return gaz
+
+    def add(self, phrase, label, value=None):
+        phrase = " ".join(phrase.lower().split())
+        if not phrase:
+            return
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        entry = (len(phrase), label, phrase if value is None else value)
+        if entry not in self._out[state]:
+            self._out[state].append(entry)
+            self.size += 1
+        self._built = False
+
+    def build(self):
+        """
+        Compute failure links (BFS) and fold outputs along them.
+        """
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + [o for o in self._out[self._fail[nxt]] if o not in self._out[nxt]]
+        self._built = True
+        return self
+
+    @staticmethod
+    def _word_end(text, end):
+        """
+        Index just past the match if it ends on a word boundary (allowing a plural 's'), else None.
+        """
+        if end == len(text) or not text[end].isalnum():
+            return end
+        if text[end] == "s" and (end + 1 == len(text) or not text[end + 1].isalnum()):
+            return end + 1
+        return None
+
+    def find(self, text):
+        """
+        Returns [Span(start, end, label, value, text)] in order of appearance.
+        """
+        if not self._built:
+            self.build()
+        lowered = text.lower()
+        hits = []
+        state = 0
+        for i, ch in enumerate(lowered):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, label, value in self._out[state]:
+                start = i + 1 - length
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                end = self._word_end(lowered, i + 1)
+                if end is not None:
+                    hits.append((start, end, label, value))
+
+        # leftmost-longest, non-overlapping
+        hits.sort(key=lambda h: (h[0], -(h[1] - h[0])))
+        spans, last_end = [], -1
+        for start, end, label, value in hits:
+            if start < last_end:
+                continue
+            spans.append(Span(start, end, label, value, text[start:end]))
+            last_end = end
+        return spans
+
+
+def first(spans, label, default=None):
+    """
+    Value of the first span with this label.
+    """
+    for span in spans or ():
+        if span.label == label:
+            return span.value
+    return default
+
+
+def values(spans, label):
+    return [span.value for span in spans or () if span.label == label]
+
+
+def blank(text, spans, label):
+    """
+    text with the spans of one label blanked out ("light 0a12 to 40" ->
+    "          to 40"), so numbers inside entity names aren't read as values.
+    """
+    for span in spans or ():
+        if span.label == label:
+            text = text[:span.start] + " " * (span.end - span.start) + text[span.end:]
+    return text
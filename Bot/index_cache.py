@@ -0,0 +1,100 @@
+"""
+On-disk cache for fitted TF-IDF matchers.
+
+Layout:  <cache_root>/<namespace>/<key>/
+             meta.json     vocabulary, vectorizer params, caller metadata
+             idf.npy       fitted IDF weights
+             data.npy, indices.npy, indptr.npy   the example matrix (CSR)
+
+<key> is a content hash of everything the fit depends on, so a changed
+example or vectorizer setting simply produces a new directory. Arrays are
+loaded with mmap_mode="r"; nothing is refitted on a hit.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+def vectorizer_settings(vectorizer):
+    """
+    JSON-safe view of the params that change what a TfidfVectorizer learns.
+    """
+    params = vectorizer.get_params()
+    params.pop("vocabulary", None)
+    return {k: (v if isinstance(v, (str, int, float, bool, type(None), list, tuple)) else repr(v))
+            for k, v in sorted(params.items())}
+
+
+def content_hash(*parts):
+    blob = json.dumps([sklearn.__version__, *parts], sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:24]
+
+
+def save_index(cache_root, namespace, key, vectorizer, matrix, meta=None):
+    if not cache_root:
+        return False
+    base = os.path.join(cache_root, namespace)
+    final = os.path.join(base, key)
+    tmp = f"{final}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(tmp, exist_ok=True)
+        matrix = sp.csr_matrix(matrix)
+        np.save(os.path.join(tmp, "data.npy"), matrix.data)
+        np.save(os.path.join(tmp, "indices.npy"), matrix.indices)
+        np.save(os.path.join(tmp, "indptr.npy"), matrix.indptr)
+        np.save(os.path.join(tmp, "idf.npy"), vectorizer.idf_)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "shape": list(matrix.shape),
+                "settings": vectorizer_settings(vectorizer),
+                "vocabulary": {term: int(i) for term, i in vectorizer.vocabulary_.items()},
+                "meta": meta or {},
+            }, f)
+        if os.path.isdir(final):
+            shutil.rmtree(tmp, ignore_errors=True)   # someone else got there first
+        else:
+            os.replace(tmp, final)
+    except OSError as e:
+        print(f"[IndexCache] ⚠️ Could not write {namespace} cache: {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+
+    # drop stale fits for this namespace (best effort: may still be mapped elsewhere)
+    for entry in os.listdir(base):
+        if entry != key and ".tmp-" not in entry:
+            shutil.rmtree(os.path.join(base, entry), ignore_errors=True)
+    return True
+
+
+def load_index(cache_root, namespace, key, vectorizer_params):
+    """
+    Returns (vectorizer, matrix, meta) or None on a miss.
+    """
+    if not cache_root:
+        return None
+    path = os.path.join(cache_root, namespace, key)
+    if not os.path.isfile(os.path.join(path, "meta.json")):
+        return None
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        data = np.load(os.path.join(path, "data.npy"), mmap_mode="r")
+        indices = np.load(os.path.join(path, "indices.npy"), mmap_mode="r")
+        indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        idf = np.load(os.path.join(path, "idf.npy"), mmap_mode="r")
+
+        matrix = sp.csr_matrix((data, indices, indptr), shape=tuple(info["shape"]), copy=False)
+        # a fixed vocabulary + idf_ is all transform() needs; no refit
+        vectorizer = TfidfVectorizer(**vectorizer_params, vocabulary=info["vocabulary"])
+        vectorizer.idf_ = np.asarray(idf)
+        return vectorizer, matrix, info.get("meta", {})
+    except Exception as e:
+        print(f"[IndexCache] ⚠️ Ignoring unreadable {namespace} cache: {e}")
+        return None
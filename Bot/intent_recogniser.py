@@ -2,7 +2,10 @@ import os
 import json
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from index_cache import content_hash, load_index, save_index, vectorizer_settings
+
+VECTORIZER_PARAMS = {"ngram_range": (1, 2)}
 
 class IntentRecognizer:
     """
@@ -13,13 +16,41 @@ class IntentRecognizer:
 
     Each intent includes a list of example phrases. This allows
     semantic recognition of user intent even if phrasing differs.
+
+    All examples are vectorized once at train time into a single
+    L2-normalized sparse matrix, grouped by intent. A query is then
+    scored with one sparse mat-vec plus a segmented max per intent.
+    The fitted model is cached on disk (see index_cache) and reused
+    until the intents file or vectorizer settings change.
     """
 
-    def __init__(self, intent_file="config/intents.json", threshold=0.6):
+    def __init__(self, intent_file="config/intents.json", threshold=0.6, index_cache_dir="default"):
         self.intent_file = intent_file
         self.threshold = threshold
+        self.index_cache_dir = index_cache_dir
         self.intents = self._load_intents()
+        self._train()
+
+    def _cache_root(self):
+        if self.index_cache_dir == "default":
+            return os.path.join(os.path.dirname(os.path.abspath(self.intent_file)), ".index_cache")
+        return self.index_cache_dir
+
+    def _train(self):
+        """
+        Load the fitted vectorizer + example matrix from cache, or fit and cache them.
+        """
+        key = content_hash(vectorizer_settings(TfidfVectorizer(**VECTORIZER_PARAMS)), self.intents)
+        cached = load_index(self._cache_root(), "intents", key, VECTORIZER_PARAMS)
+        if cached:
+            self.vectorizer, self.example_matrix, meta = cached
+            self.intent_labels = meta["labels"]
+            self.intent_offsets = np.asarray(meta["offsets"], dtype=np.intp)
+            return
         self.vectorizer = self._train_vectorizer()
+        self._build_example_matrix()
+        save_index(self._cache_root(), "intents", key, self.vectorizer, self.example_matrix,
+                   {"labels": self.intent_labels, "offsets": self.intent_offsets.tolist()})
 
     def _load_intents(self):
         """
@@ -44,28 +75,63 @@ class IntentRecognizer:
         Fit the TF-IDF vectorizer on all intent phrases.
         """
         corpus = [phrase for patterns in self.intents.values() for phrase in patterns]
-        vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+        vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
         vectorizer.fit(corpus)
         return vectorizer
 
+    def _build_example_matrix(self):
+        """
+        Vectorize every example once, stacked intent by intent.
+        self.intent_offsets[i] is the first row of self.intent_labels[i],
+        which is exactly the layout np.maximum.reduceat expects.
+        """
+        labels, offsets, corpus = [], [], []
+        for intent, examples in self.intents.items():
+            if not examples:
+                continue  # an empty segment would break reduceat
+            labels.append(intent)
+            offsets.append(len(corpus))
+            corpus.extend(examples)
+
+        self.intent_labels = labels
+        self.intent_offsets = np.asarray(offsets, dtype=np.intp)
+        # Rows are unit length, so a dot product is the cosine similarity
+        self.example_matrix = normalize(self.vectorizer.transform(corpus), norm="l2").tocsr()
+
+    def _score(self, texts):
+        """
+        Returns a (len(texts), n_intents) array of best-example cosine scores.
+        """
+        queries = self.vectorizer.transform([t.lower() for t in texts])
+        sims = (queries @ self.example_matrix.T).toarray()
+        return np.maximum.reduceat(sims, self.intent_offsets, axis=1)
+
     def predict_intent(self, user_input):
         """
         Returns the most likely intent and its confidence score.
         If below threshold, returns None.
         """
-        user_vec = self.vectorizer.transform([user_input.lower()])
-        best_intent, best_score = None, 0.0
+        return self.predict_intents([user_input])[0]
 
-        for intent, examples in self.intents.items():
-            example_vecs = self.vectorizer.transform(examples)
-            sim = cosine_similarity(user_vec, example_vecs)
-            score = np.max(sim)
-            if score > best_score:
-                best_intent, best_score = intent, score
+    def predict_intents(self, texts):
+        """
+        Batch version of predict_intent: scores all texts in one matrix
+        product and returns a list of (intent or None, score).
+        """
+        texts = list(texts)
+        if not texts or not self.intent_labels:
+            return [(None, 0.0) for _ in texts]
 
-        if best_score < self.threshold:
-            return None, best_score
-        return best_intent, best_score
+        scores = self._score(texts)
+        best = np.argmax(scores, axis=1)
+        results = []
+        for row, idx in enumerate(best):
+            score = float(scores[row, idx])
+            if score < self.threshold:
+                results.append((None, score))
+            else:
+                results.append((self.intent_labels[idx], score))
+        return results
 
     def retrain(self, new_intents_path=None):
         """
@@ -74,7 +140,7 @@ class IntentRecognizer:
         if new_intents_path:
             self.intent_file = new_intents_path
         self.intents = self._load_intents()
-        self.vectorizer = self._train_vectorizer()
+        self._train()
         print("Intent model retrained successfully.")
 
 
@@ -0,0 +1,201 @@
+"""
+In-process metrics for the voice-to-action pipeline.
+
+Counters and fixed-bucket histograms keyed by (name, labels). Recording
+is a dict lookup, a bisect and a couple of additions under one lock, so
+it stays on in production; ATHENA_METRICS=0 turns recording off.
+
+Snapshots are exported as Prometheus text (server GET /metrics) or JSON
+(GET /metrics.json, or a file written every few seconds when
+ATHENA_METRICS_FILE is set).
+
+    from metrics import METRICS
+    t0 = time.perf_counter()
+    ...
+    METRICS.observe("athena_stage_seconds", time.perf_counter() - t0, stage="prep")
+    METRICS.inc("athena_queries_total", outcome="executed")
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+
+# 50us .. ~26s, doubling
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** i for i in range(20))
+
+HELP = {
+    "athena_stage_seconds": "Time spent in each pipeline stage.",
+    "athena_query_seconds": "End-to-end time to answer one query.",
+    "athena_tool_seconds": "Tool command execution time per (intent, cmd).",
+    "athena_queries_total": "Queries handled, by outcome.",
+    "athena_tool_calls_total": "Tool command calls, by outcome.",
+    "athena_tool_cache_hits_total": "Tool command results served from the result cache.",
+    "athena_matches_total": "Command matches, by path (exact, memo, tfidf).",
+    "athena_asr_audio_seconds": "Audio length of each recognised utterance.",
+    "athena_asr_events_total": "Audio worker events (partial, final, overrun, wake).",
+    "athena_startup_seconds": "Time to bring up each subsystem at startup.",
+}
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-th observation.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=None, buckets=LATENCY_BUCKETS):
+        if enabled is None:
+            enabled = os.environ.get("ATHENA_METRICS", "1") not in ("0", "false", "off")
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}   # (name, ((label, value), ...)) -> _Histogram
+        self._counters = {}     # (name, ((label, value), ...)) -> float
+        self.started = time.time()
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # ---------------- export ----------------
+    def snapshot(self):
+        """
+        JSON-friendly view: counters plus histogram count/sum/mean and
+        bucket-estimated p50/p90/p99.
+        """
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()]
+            histograms = []
+            for (n, l), h in self._histograms.items():
+                histograms.append({
+                    "name": n, "labels": dict(l), "count": h.count, "sum": h.sum,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    "p50": h.quantile(0.50), "p90": h.quantile(0.90), "p99": h.quantile(0.99),
+                })
+        return {"timestamp": time.time(), "uptime_s": time.time() - self.started,
+                "counters": sorted(counters, key=_sort_key), "histograms": sorted(histograms, key=_sort_key)}
+
+    def to_prometheus(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (list(h.counts), h.sum, h.count)) for k, h in self._histograms.items())
+
+        lines, described = [], set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Atomically write a snapshot; Prometheus text for *.prom, else JSON.
+        """
+        blob = self.to_prometheus() if path.endswith(".prom") else json.dumps(self.snapshot(), indent=2)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+    def export_periodically(self, path, interval=15.0):
+        """
+        Start a daemon thread rewriting `path` every `interval` seconds.
+        Returns a threading.Event that stops it (after one last write).
+        """
+        stop = threading.Event()
+
+        def _run():
+            while not stop.wait(interval):
+                self._safe_write(path)
+            self._safe_write(path)
+
+        threading.Thread(target=_run, name="athena-metrics", daemon=True).start()
+        return stop
+
+    def _safe_write(self, path):
+        try:
+            self.write(path)
+        except OSError as e:
+            print(f"[Metrics] ⚠️ couldn't write {path}: {e}")
+
+
+def _sort_key(entry):
+    return entry["name"], sorted(entry["labels"].items())
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+METRICS = MetricsRegistry()
@@ -1,40 +1,95 @@
 import asyncio
+import inspect
+import os
 import re
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+import time
 from tool_registry import ToolRegistry
+from event_loop import BackgroundLoop
+from result_cache import ResultCache
+from command_index import CommandIndex
+from gazetteer import Gazetteer
+from device_registry import DEVICES
+from session_store import SessionStore
+from tool_executor import ToolExecutor
+from metrics import METRICS
 
 # If you already have a richer extractor, import and use it here
 try:
     from entity_extractor import extract_entities
 except Exception:
-    def extract_entities(_text: str):
+    def extract_entities(_text: str, spans=None):
         return {}
 
 
+def _normalize(text):
+    return re.sub(r"[^\w\s]", "", text.lower().strip())
+
+
+# "turn off the lights and tell me tomorrow's weather" -> two clauses
+CLAUSE_SPLIT_RE = re.compile(r"\s*(?:[,;]\s*(?:and\s+|then\s+)*|\b(?:and\s+then|and\s+also|and|then|also)\b)\s*")
+
+
 class MultiStageProcessor:
-    def __init__(self, tools_manifest="config/tools.json", direct_threshold=0.65):
+    def __init__(self, tools_manifest="config/tools.json", direct_threshold=0.65, result_cache_size=256,
+                 index_cache_dir="default", speculate_threshold=0.8, memo_size=512,
+                 session_ttl=300, max_sessions=1024, tool_workers=8, settle_timeout=0.25):
         self.tool_registry = ToolRegistry(tools_manifest)
         self.threshold = direct_threshold
-        self.vectorizer = None
-        self.matrix = None
-        self.index = []       # [(intent, cmd, func)]
+        self.speculate_threshold = speculate_threshold
+        self.settle_timeout = settle_timeout      # how long a final transcript waits for its pre-warm
+        # fitted index is cached next to the manifest; None disables the cache
+        if index_cache_dir == "default":
+            index_cache_dir = os.path.join(os.path.dirname(os.path.abspath(tools_manifest)), ".index_cache")
+        self.index_cache_dir = index_cache_dir
+
+        # current CommandIndex snapshot (rows, TF-IDF matrix, inverted index, and the
+        # exact/memo fast path); replaced as a whole when tools are reloaded
+        self.memo_size = memo_size
+        self.command_index = None
+        self._match_counts = {"exact": 0, "memo": 0, "tfidf": 0}
+        self._counts_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
         self._build_command_tfidf()
 
-        # simple slot-filling memory (optional; still works as before)
-        self.context = None
+        # one automaton over every tool's vocabulary and the device names; entity spans are found once per utterance
+        self.gazetteer = self._build_gazetteer()
+        self._resolver_args = {}
+
+        # slot-filling memory, one pending command per session (see context for the local one)
+        self.sessions = SessionStore(ttl=session_ttl, maxsize=max_sessions)
+
+        # one long-lived loop for sync callers; async callers use their own
+        self._loop = BackgroundLoop("athena-msp")
+
+        # runs tool functions: thread pool for sync tools, timeouts, per-tool limits
+        self.executor = ToolExecutor(max_workers=tool_workers)
+
+        # results of commands that declare cache_ttl in their TOOL_SPEC
+        self.result_cache = ResultCache(maxsize=result_cache_size)
+
+        # pre-warm work started from a partial ASR hypothesis (see speculate)
+        self._speculation = None
 
     # ---------------- TF-IDF ----------------
     def _prep(self, text):
-        text = text.lower().strip()
-        text = re.sub(r"[^\w\s]", "", text)
+        t0 = time.perf_counter()
+        text = _normalize(text)
+        METRICS.observe("athena_stage_seconds", time.perf_counter() - t0, stage="prep")
         return text
 
-    def _build_command_tfidf(self):
-        all_examples = []
-        self.index = []
+    # the current snapshot's parts, for callers that only read them
+    vectorizer = property(lambda self: self.command_index.vectorizer)
+    matrix = property(lambda self: self.command_index.matrix)
+    matcher = property(lambda self: self.command_index.matcher)
+    index = property(lambda self: self.command_index.index)
 
+    def _command_rows(self):
+        """
+        [(intent, cmd, func, prepped example)] for every registered command.
+        """
+        rows = []
         examples_dict = self.tool_registry.get_all_examples()
         for intent, cmds in examples_dict.items():
             for cmd, examples in cmds.items():
@@ -43,25 +98,175 @@ class MultiStageProcessor:
                     continue
                 func, example_list, params, defaults = meta
                 for ex in example_list:
-                    all_examples.append(self._prep(ex))
-                    self.index.append((intent, cmd, func))
-
-        if not all_examples:
-            print("[MSP] ⚠️ No command examples found. Processor disabled.")
-            return
+                    rows.append((intent, cmd, func, self._prep(ex)))
+        return rows
 
-        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2))
-        self.matrix = self.vectorizer.fit_transform(all_examples)
-        print(f"[MSP] ✅ Loaded {len(all_examples)} example commands from tools.")
+    def _build_command_tfidf(self):
+        self.command_index = CommandIndex.build(self._command_rows(), self.index_cache_dir, self.memo_size)
 
     def _best_match(self, text):
-        if not text.strip() or self.matrix is None or not self.matrix.shape[0]:
+        t0 = time.perf_counter()
+        key = self._prep(text)
+        if not key:
+            return None, None, None, 0.0
+
+        idx = self.command_index
+        fast = self._fast_match(idx, key)
+        if fast:
+            METRICS.observe("athena_stage_seconds", time.perf_counter() - t0, stage="best_match")
+            return fast
+
+        matches = self._rank(idx, key, 1)
+        result = matches[0] if matches else (None, None, None, 0.0)
+        self._remember_match(idx, key, result)
+        METRICS.observe("athena_stage_seconds", time.perf_counter() - t0, stage="best_match")
+        return result
+
+    def _best_matches(self, texts):
+        """
+        _best_match for several texts (clauses of one utterance): fast-path
+        hits first, then every miss is scored in a single sparse matrix
+        product against the example matrix.
+        """
+        idx = self.command_index
+        keys = [self._prep(t) for t in texts]
+        results = [(None, None, None, 0.0)] * len(texts)
+        todo = []
+        for i, key in enumerate(keys):
+            if not key:
+                continue
+            fast = self._fast_match(idx, key)
+            if fast:
+                results[i] = fast
+            else:
+                todo.append(i)
+
+        if todo and idx.matrix is not None:
+            t0 = time.perf_counter()
+            x = idx.vectorizer.transform([keys[i] for i in todo])
+            METRICS.observe("athena_stage_seconds", time.perf_counter() - t0, stage="vectorize")
+            scores = (x @ idx.matrix.T).toarray()
+            for j, i in enumerate(todo):
+                row = int(scores[j].argmax())
+                score = float(scores[j, row])
+                result = (*idx.index[row], score) if score > 0 else (None, None, None, 0.0)
+                self._remember_match(idx, keys[i], result)
+                results[i] = result
+        return results
+
+    def _remember_match(self, idx, key, result):
+        METRICS.inc("athena_matches_total", path="tfidf")
+        with self._counts_lock:
+            self._match_counts["tfidf"] += 1
+        idx.remember(key, result)
+
+    def _fast_match(self, idx, key):
+        """
+        Exact example text or a recently resolved utterance: no vectorizing.
+        """
+        path, hit = idx.lookup(key)
+        if path:
+            with self._counts_lock:
+                self._match_counts[path] += 1
+            METRICS.inc("athena_matches_total", path=path)
+        return hit
+
+    # ------------- HOT RELOAD -------------
+    def reload_tools(self, intents=None):
+        """
+        Re-read changed tools (intents=None: re-read tools.json) and swap in
+        an updated command index and gazetteer. Queries already running
+        finish on the snapshot they started with.
+        """
+        with self._reload_lock:
+            t0 = time.perf_counter()
+            if intents is None:
+                changed = self.tool_registry.reload_manifest()
+            else:
+                changed = set()
+                for intent in intents:
+                    # the live module is only shut down once the new source is known to load
+                    if self.tool_registry.reload_tool(intent, before_reload=lambda i=intent: self._shutdown_tool(i)):
+                        changed.add(intent)
+            if not changed:
+                return None
+
+            index, info = self.command_index.updated(self._command_rows(), self.index_cache_dir)
+            gazetteer = self._build_gazetteer()
+            # swap: plain attribute assignment, readers see the old or the new snapshot
+            self.command_index = index
+            self.gazetteer = gazetteer
+            self._resolver_args = {}
+            for intent in changed:
+                self.result_cache.invalidate(intent)
+
+            info = {**info, "tools": sorted(changed), "rows": len(index.rows),
+                    "seconds": time.perf_counter() - t0}
+            print(f"[MSP] 🔄 Reloaded {', '.join(info['tools'])}: +{info['added']} -{info['removed']} examples"
+                  f"{' (refit)' if info['refit'] else ''} in {info['seconds'] * 1000:.0f} ms")
+            return info
+
+    def _shutdown_tool(self, intent):
+        """
+        Let an imported tool release pooled resources before it is re-executed.
+        """
+        hook = getattr(self.tool_registry.tools.get(intent), "shutdown", None)
+        if not hook or not self._loop.running:
+            return
+        try:
+            self._loop.run(self._maybe_await(hook))
+        except Exception as e:
+            print(f"[MSP] ⚠️ shutdown failed for {intent}: {e}")
+
+    def _peek_match(self, text):
+        """
+        _best_match for a partial ASR hypothesis: nothing is memoized or
+        counted, so a stream of partials doesn't evict real utterances
+        from the memo or skew the match metrics.
+        """
+        key = _normalize(text)
+        idx = self.command_index
+        if not key:
+            return None, None, None, 0.0
+        _, hit = idx.lookup(key)
+        if hit:
+            return hit
+        if idx.matcher is None:
             return None, None, None, 0.0
-        x = self.vectorizer.transform([self._prep(text)])
-        sims = cosine_similarity(x, self.matrix).flatten()
-        best_idx = int(np.argmax(sims))
-        intent, cmd, func = self.index[best_idx]
-        return intent, cmd, func, float(sims[best_idx])
+        top = idx.matcher.top_k(idx.vectorizer.transform([key]), 1)
+        return (*idx.index[top[0][0]], top[0][1]) if top else (None, None, None, 0.0)
+
+    def match_stats(self):
+        """
+        How often _best_match was answered by the exact/memo fast path vs TF-IDF.
+        """
+        with self._counts_lock:
+            counts = dict(self._match_counts)
+        memo_size = len(self.command_index.memo)
+        total = sum(counts.values())
+        fast = counts["exact"] + counts["memo"]
+        return {**counts, "total": total, "memo_size": memo_size,
+                "fast_path_rate": (fast / total) if total else 0.0}
+
+    def top_matches(self, text, k=3):
+        """
+        Returns up to k [(intent, cmd, func, score)] best first. Only
+        examples sharing at least one n-gram with the text are scored.
+        """
+        if not text.strip():
+            return []
+        return self._rank(self.command_index, self._prep(text), k)
+
+    def _rank(self, idx, key, k):
+        if idx.matcher is None:
+            return []
+        t0 = time.perf_counter()
+        x = idx.vectorizer.transform([key])
+        t1 = time.perf_counter()
+        top = idx.matcher.top_k(x, k)
+        METRICS.observe("athena_stage_seconds", t1 - t0, stage="vectorize")
+        METRICS.observe("athena_stage_seconds", time.perf_counter() - t1, stage="match")
+        return [(*idx.index[row], score) for row, score in top]
 
     async def _maybe_await(self, func, **kwargs):
         res = func(**kwargs)
@@ -70,12 +275,15 @@ class MultiStageProcessor:
         return res
 
     # ------------- PARAM MERGE LOGIC (defaults!) -------------
-    def _merge_params(self, intent, cmd, user_text):
+    def _merge_params(self, intent, cmd, user_text, record=True):
         """
         Merge params in this order (later wins):
           1) defaults from TOOL_SPEC.commands[cmd].defaults
           2) tool.resolve_params(user_text) if available
           3) global extract_entities(user_text)
+        Both 2) and 3) get the same gazetteer spans, found in one pass;
+        resolve_params also gets the matched cmd if it takes it.
+        record=False (speculation on partials) keeps the stage timings out of METRICS.
         """
         module = self.tool_registry.get_tool(intent)
         defaults = {}
@@ -85,44 +293,120 @@ class MultiStageProcessor:
         meta = self.tool_registry.get_command_meta(intent, cmd)
         _, _, params_list, defaults = meta if meta else (None, None, [], {})
 
+        t0 = time.perf_counter()
+        if self._gazetteer_devices != DEVICES.version:     # discovery named a new bulb
+            self.gazetteer = self._build_gazetteer()
+        spans = self.gazetteer.find(user_text)
+        t1 = time.perf_counter()
+        if record:
+            METRICS.observe("athena_stage_seconds", t1 - t0, stage="gazetteer")
+
         if hasattr(module, "resolve_params"):
             try:
-                resolved = module.resolve_params(user_text) or {}
+                extra = {"spans": spans, "cmd": cmd}
+                accepted = self._resolver_accepts(module.resolve_params)
+                resolved = module.resolve_params(user_text, **{k: v for k, v in extra.items() if k in accepted}) or {}
             except Exception as e:
                 print(f"[MSP] ⚠️ resolve_params failed for {intent}.{cmd}: {e}")
                 resolved = {}
+        t2 = time.perf_counter()
+        if record:
+            METRICS.observe("athena_stage_seconds", t2 - t1, stage="resolve_params")
 
         try:
-            entities = extract_entities(user_text) or {}
+            entities = extract_entities(user_text, spans=spans) or {}
         except Exception as e:
             print(f"[MSP] ⚠️ extract_entities failed: {e}")
             entities = {}
+        if record:
+            METRICS.observe("athena_stage_seconds", time.perf_counter() - t2, stage="extract_entities")
 
         # Merge: defaults → resolved → entities (explicit > default)
         merged = {**(defaults or {}), **(resolved or {}), **(entities or {})}
         return merged, params_list
 
+    def _build_gazetteer(self):
+        self._gazetteer_devices = DEVICES.version
+        return Gazetteer.from_vocabulary(self.tool_registry.get_vocabulary(), DEVICES.vocabulary())
+
+    def _resolver_accepts(self, func):
+        """
+        Which of the optional resolve_params arguments ("spans", "cmd") func takes.
+        """
+        known = self._resolver_args.get(func)
+        if known is None:
+            try:
+                sig = inspect.signature(func).parameters
+                if any(p.kind is p.VAR_KEYWORD for p in sig.values()):
+                    known = frozenset(("spans", "cmd"))
+                else:
+                    known = frozenset(name for name in ("spans", "cmd") if name in sig)
+            except (TypeError, ValueError):
+                known = frozenset()
+            self._resolver_args[func] = known
+        return known
+
     # ------------- CONTEXT + EXECUTION -------------
-    def process_query(self, user_input: str):
+    LOCAL_SESSION = "local"
+
+    @property
+    def context(self):
+        """
+        Pending slot-filling context of the local (console / voice) session.
+        """
+        return self.sessions.get(self.LOCAL_SESSION)
+
+    @context.setter
+    def context(self, value):
+        self.sessions.set(self.LOCAL_SESSION, value)
+
+    def process_query(self, user_input: str, session=None):
+        """
+        Sync entry point: runs aprocess_query on the processor's persistent loop.
+        """
+        return self._loop.run(self.aprocess_query(user_input, session))
+
+    def submit_query(self, user_input: str, session=None):
+        """
+        Schedule aprocess_query on the processor's loop without blocking;
+        returns a concurrent.futures.Future. Used by the server so every
+        tool call runs on the same loop whatever thread or loop the request
+        came in on.
+        """
+        return self._loop.submit(self.aprocess_query(user_input, session))
+
+    async def aprocess_query(self, user_input: str, session=None):
+        t0 = time.perf_counter()
+        response = await self._aprocess_query(user_input, session)
+        elapsed = time.perf_counter() - t0
+        METRICS.observe("athena_query_seconds", elapsed)
+        METRICS.inc("athena_queries_total", outcome="followup" if response[1] else "executed")
+        return response
+
+    async def _aprocess_query(self, user_input, session):
         text = user_input.lower().strip()
+        session = self.LOCAL_SESSION if session is None else session
 
         # If we were waiting for missing params, keep filling:
-        if self.context:
-            pending = self.context
+        pending = self.sessions.get(session)
+        if pending:
             prev_params = pending["params"]
             updates, params_list = self._merge_params(pending["intent"], pending["cmd"], text)
             merged = {**prev_params, **updates}
 
             missing_after = [p for p in params_list if merged.get(p) is None]
             if not missing_after or text in ("that's all", "thats all", "done"):
-                result = self._execute_intent(pending["intent"], pending["cmd"], merged)
-                self.context = None
-                return result
+                self.sessions.pop(session)
+                return await self._execute_intent(pending["intent"], pending["cmd"], merged)
             else:
-                self.context["params"] = merged
-                self.context["missing"] = missing_after
+                self.sessions.set(session, {**pending, "params": merged, "missing": missing_after})
                 return f"ATHENA: Do you have info for {', '.join(missing_after)}? If not, say 'that's all'.", True
 
+        # Several commands in one go ("... and ...")
+        compound = self._match_compound(user_input)
+        if compound:
+            return await self._execute_compound(compound, session)
+
         # Normal path
         intent, cmd, func, score = self._best_match(user_input)
         if not intent or score < self.threshold:
@@ -130,22 +414,234 @@ class MultiStageProcessor:
 
         # Build params with defaults support
         params, params_list = self._merge_params(intent, cmd, user_input)
+        if session == self.LOCAL_SESSION:   # only the voice front end speculates
+            await self._settle_speculation(intent, cmd, params)
 
         # A param is considered "required" only if it's listed and not provided by defaults
         missing = [p for p in params_list if params.get(p) is None]
         if missing:
             # store context to fill later
-            self.context = {"intent": intent, "cmd": cmd, "params": params, "missing": missing}
+            self.sessions.set(session, {"intent": intent, "cmd": cmd, "params": params, "missing": missing})
             # declare missing ones
             return f"ATHENA: I need more information — required: {', '.join(missing)}.", True
 
         # execute immediately
-        return self._execute_intent(intent, cmd, params)
+        return await self._execute_intent(intent, cmd, params)
+
+    async def _execute_intent(self, intent, cmd, params):
+        return f"ATHENA: {await self._run_command(intent, cmd, params)}", False
 
-    def _execute_intent(self, intent, cmd, params):
+    async def _run_command(self, intent, cmd, params):
+        t0 = time.perf_counter()
+        outcome = "ok"
         try:
-            func, _, _, _ = self.tool_registry.get_command_meta(intent, cmd)
-            result = asyncio.run(self._maybe_await(func, **params))
-            return f"ATHENA: {result}", False
+            return await self._call_tool(intent, cmd, params)
+        except TimeoutError as e:
+            outcome = "timeout"
+            return f"Error executing {cmd}: {e}"
         except Exception as e:
-            return f"ATHENA: Error executing {cmd}: {e}", False
+            outcome = "error"
+            return f"Error executing {cmd}: {e}"
+        finally:
+            METRICS.observe("athena_tool_seconds", time.perf_counter() - t0, intent=intent, cmd=cmd)
+            METRICS.inc("athena_tool_calls_total", intent=intent, cmd=cmd, outcome=outcome)
+
+    # ------------- COMPOUND UTTERANCES -------------
+    def _split_clauses(self, user_input):
+        return [c for c in CLAUSE_SPLIT_RE.split(user_input.strip()) if c and c.strip()]
+
+    def _match_compound(self, user_input):
+        """
+        [(clause, intent, cmd, params, params_list)] when the utterance
+        splits into 2+ clauses that each confidently match a command;
+        otherwise None and the utterance is handled as one command
+        ("turn on the top and middle lamp" stays a single clause).
+        """
+        clauses = self._split_clauses(user_input)
+        if len(clauses) < 2:
+            return None
+        matches = self._best_matches(clauses)
+        if any(not intent or score < self.threshold for intent, _, _, score in matches):
+            return None
+        out = []
+        for clause, (intent, cmd, _, _) in zip(clauses, matches):
+            params, params_list = self._merge_params(intent, cmd, clause)
+            out.append((clause, intent, cmd, params, params_list))
+        return out
+
+    async def _execute_compound(self, clauses, session):
+        """
+        Commands for different tools run concurrently; commands for the
+        same tool keep their spoken order ("turn off the lamp then set it
+        to 40%"). The first clause still missing params is parked in the
+        session context and asked about after the rest have run.
+        """
+        ready, incomplete = [], None
+        for clause, intent, cmd, params, params_list in clauses:
+            missing = [p for p in params_list if params.get(p) is None]
+            if missing:
+                incomplete = incomplete or {"intent": intent, "cmd": cmd, "params": params, "missing": missing}
+            else:
+                ready.append((intent, cmd, params))
+
+        if session == self.LOCAL_SESSION:
+            spec = self._speculation
+            match = spec and next(((i, c, p) for i, c, p in ready if (i, c) == (spec["intent"], spec["cmd"])), None)
+            if match:
+                await self._settle_speculation(*match)
+            else:
+                self._discard_speculation()
+
+        by_tool = {}
+        for pos, (intent, cmd, params) in enumerate(ready):
+            by_tool.setdefault(intent, []).append((pos, cmd, params))
+
+        async def run_tool(intent, calls):
+            return [(pos, await self._run_command(intent, cmd, params)) for pos, cmd, params in calls]
+
+        groups = await asyncio.gather(*(run_tool(intent, calls) for intent, calls in by_tool.items()))
+        results = [str(result) for _, result in sorted(r for group in groups for r in group)]
+
+        if incomplete:
+            self.sessions.set(session, incomplete)
+            results.append(f"I need more information — required: {', '.join(incomplete['missing'])}.")
+            return "ATHENA: " + " ".join(results), True
+        return "ATHENA: " + " ".join(results), False
+
+    async def _call_tool(self, intent, cmd, params):
+        """
+        Run a command through the executor, serving it from the result
+        cache when its TOOL_SPEC declares cache_ttl. Identical calls that
+        miss at the same time share one run. Exceptions (including
+        timeouts) propagate and are never cached.
+        """
+        options = self.tool_registry.get_command_options(intent, cmd)
+        ttl = options["cache_ttl"]
+
+        key = flight = None
+        if ttl > 0:
+            key = ResultCache.make_key(intent, cmd, params, options["cache_key"])
+            state, value = self.result_cache.lookup(key)
+            if state == "hit":
+                METRICS.inc("athena_tool_cache_hits_total", intent=intent, cmd=cmd)
+                return value
+            if state == "wait":
+                # shield: a waiter giving up mustn't cancel the shared call
+                return await asyncio.shield(asyncio.wrap_future(value))
+            flight = value
+
+        try:
+            func = self.tool_registry.get_callable(intent, cmd)
+            if func is None:
+                raise RuntimeError(f"{intent}.{cmd} is no longer available")
+            result = await self.executor.run(intent, func, params, timeout=options["timeout"],
+                                             max_concurrency=options["max_concurrency"])
+        except BaseException as e:
+            if flight is not None:
+                self.result_cache.discard(key, flight, e)
+            raise
+
+        if flight is not None:
+            self.result_cache.put(key, result, ttl, flight)
+        for target_intent, target_cmd in options["invalidates"]:
+            self.result_cache.invalidate(target_intent, target_cmd)
+        return result
+
+    # ------------- SPECULATION (partial ASR results) -------------
+    def speculate(self, partial_text):
+        """
+        Called with in-progress ASR hypotheses. If the partial text already
+        matches a command confidently, start warming it in the background:
+        the tool's optional prefetch(cmd, params) hook, or for cacheable
+        commands the call itself (the result lands in the result cache).
+        Nothing that changes the world is run here.
+        """
+        if self.context or not partial_text.strip():
+            return None
+        intent, cmd, _, score = self._peek_match(partial_text)
+        if not intent or score < self.speculate_threshold:
+            return None
+        params, params_list = self._merge_params(intent, cmd, partial_text, record=False)
+        if any(params.get(p) is None for p in params_list):
+            return None
+
+        key = ResultCache.make_key(intent, cmd, params)
+        current = self._speculation
+        if current and current["key"] == key:
+            return current["future"]
+        self._discard_speculation()
+        future = self._loop.submit(self._prewarm(intent, cmd, params))
+        self._speculation = {"intent": intent, "cmd": cmd, "key": key, "future": future}
+        return future
+
+    async def _prewarm(self, intent, cmd, params):
+        module = self.tool_registry.get_tool(intent)
+        hook = getattr(module, "prefetch", None)
+        if hook:
+            return await self._maybe_await(hook, cmd=cmd, params=params)
+        if self.tool_registry.get_command_options(intent, cmd)["cache_ttl"] > 0:
+            return await self._call_tool(intent, cmd, params)
+        return None
+
+    def _discard_speculation(self):
+        spec, self._speculation = self._speculation, None
+        if spec:
+            spec["future"].cancel()
+
+    async def _settle_speculation(self, intent, cmd, params):
+        """
+        Final transcript arrived: give matching pre-warm work (commit) up
+        to settle_timeout to finish so the real call finds warm caches,
+        otherwise cancel it (discard). A slow prefetch (an unreachable
+        bulb) is cancelled rather than waited for.
+        """
+        spec = self._speculation
+        if not spec:
+            return
+        if spec["intent"] != intent or spec["cmd"] != cmd or \
+                spec["key"] != ResultCache.make_key(intent, cmd, params):
+            self._discard_speculation()
+            return
+        self._speculation = None
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(spec["future"]), self.settle_timeout)
+        except asyncio.TimeoutError:
+            print(f"[MSP] speculative prefetch for {intent}.{cmd} still running; not waiting for it")
+        except (Exception, asyncio.CancelledError) as e:
+            print(f"[MSP] ⚠️ speculative prefetch for {intent}.{cmd} failed: {e}")
+
+    # ------------- RESULT CACHE -------------
+    def invalidate_cache(self, intent=None, cmd=None):
+        """
+        Clear cached results for a command, a tool, or everything.
+        """
+        return self.result_cache.invalidate(intent, cmd)
+
+    def cache_stats(self):
+        return self.result_cache.stats()
+
+    def executor_stats(self):
+        return self.executor.stats()
+
+    async def ashutdown_tools(self):
+        """
+        Give loaded tools a chance to release pooled resources (optional
+        module-level shutdown(), sync or async).
+        """
+        for intent, module in list(self.tool_registry.tools.items()):
+            hook = getattr(module, "shutdown", None)
+            if not hook:
+                continue
+            try:
+                await self._maybe_await(hook)
+            except Exception as e:
+                print(f"[MSP] ⚠️ shutdown failed for {intent}: {e}")
+
+    def close(self):
+        """
+        Shut tools down on the persistent loop, then stop it and the tool thread pool.
+        """
+        if self._loop.running:
+            self._loop.run(self.ashutdown_tools())
+        self._loop.stop()
+        self.executor.shutdown()
@@ -0,0 +1,148 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ResultCache:
+    """
+    Bounded LRU + TTL cache for tool command results.
+
+    Keys are (intent, cmd, frozen_params). Entries expire after the
+    TTL declared by the command (TOOL_SPEC "cache_ttl") and the least
+    recently used entry is evicted once maxsize is reached.
+
+    Misses are single-flight: lookup() hands the first caller for a key
+    a future to settle (put / discard) and every concurrent caller for the
+    same key that future to wait on, so the tool runs once.
+    """
+
+    def __init__(self, maxsize=256, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._inflight = {}          # key -> Future of the call computing it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0              # misses that waited on a call already in flight
+
+    @staticmethod
+    def make_key(intent, cmd, params, key_params=None):
+        """
+        Build a hashable key from the params that matter for this command.
+        Strings are case-folded so "Sydney" and "sydney" share an entry.
+        """
+        names = key_params if key_params is not None else sorted(params)
+        frozen = []
+        for name in names:
+            value = params.get(name)
+            if isinstance(value, str):
+                value = value.strip().lower()
+            elif isinstance(value, (list, dict, set)):
+                value = repr(value)
+            frozen.append((name, value))
+        return (intent, cmd, tuple(frozen))
+
+    def get(self, key):
+        """
+        Returns (True, value) on a fresh hit, (False, None) otherwise.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def lookup(self, key):
+        """
+        Single-flight get. Returns ("hit", value) on a fresh hit,
+        ("wait", future) when another caller is computing this key, or
+        ("miss", future) when the caller should compute it and then settle
+        the future with put(..., future) or discard(..., future).
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return "hit", value
+                del self._data[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.joined += 1
+                return "wait", future
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            return "miss", future
+
+    def discard(self, key, future, error):
+        """
+        The call behind a lookup() miss failed: wake its waiters with the
+        error and cache nothing.
+        """
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if not isinstance(error, Exception):     # cancelled: waiters get an error, not a cancellation
+            error = RuntimeError("the call was cancelled")
+        future.set_exception(error)
+
+    def put(self, key, value, ttl, future=None):
+        """
+        Cache a value. With the future from a lookup() miss, its waiters
+        get the value too; it's only cached if the key wasn't invalidated
+        while the call ran.
+        """
+        if future is not None:
+            with self._lock:
+                current = self._inflight.get(key) is future
+                if current:
+                    del self._inflight[key]
+            future.set_result(value)
+            if not current:
+                return
+        if not ttl or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, intent=None, cmd=None):
+        """
+        Drop entries for one command, one tool, or everything (no args).
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            doomed = [k for k in self._data
+                      if (intent is None or k[0] == intent) and (cmd is None or k[1] == cmd)]
+            for k in doomed:
+                del self._data[k]
+            # calls in flight still answer their waiters, but their result isn't cached
+            for k in [k for k in self._inflight
+                      if (intent is None or k[0] == intent) and (cmd is None or k[1] == cmd)]:
+                del self._inflight[k]
+            return len(doomed)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "joined": self.joined,
+                "in_flight": len(self._inflight),
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,250 @@
+"""
+Long-running ATHENA server: a small local HTTP/JSON endpoint for chat
+adapters (Telegram etc.) and test clients.
+
+One MultiStageProcessor (and so one tool registry, one fitted index and
+one result cache) serves every request; slot-filling context is kept per
+session in the processor's SessionStore. Every query must name its
+session, so two clients never answer each other's follow-up questions.
+
+    POST /query   {"text": "turn off the lights", "session": "telegram:1234"}
+               -> {"response": "ATHENA: ...", "continue": false, "session": "telegram:1234"}
+    GET  /health  -> processor / session / cache stats
+    GET  /metrics -> per-stage latency histograms and counters (Prometheus text)
+    GET  /metrics.json -> the same as JSON
+
+    python Bot/server.py --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from multi_stage_processor import MultiStageProcessor
+from metrics import METRICS
+from tool_watcher import ToolWatcher
+
+MAX_BODY = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AthenaServer:
+    """
+    asyncio HTTP/1.1 server (keep-alive, JSON bodies only) in front of a
+    shared processor. Queries are handed to the processor's own loop with
+    submit_query, so tools keep their pooled connections no matter how
+    many clients are connected.
+    """
+
+    def __init__(self, processor, host="127.0.0.1", port=8765, request_timeout=30.0, idle_timeout=60.0):
+        self.processor = processor
+        self.host = host
+        self.port = port
+        self.request_timeout = request_timeout
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.requests = 0
+        self.active = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]   # resolves port=0
+        print(f"[Server] ✅ Listening on http://{self.host}:{self.port}")
+        return self
+
+    async def serve_forever(self):
+        if not self._server:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # ---------------- HTTP ----------------
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                status, payload = await self._dispatch(method, path, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, "bad Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # ---------------- ROUTES ----------------
+    async def _dispatch(self, method, path, body):
+        if path == "/query":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            return await self._query(body)
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, self.health()
+        if path in ("/metrics", "/metrics.json"):
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, METRICS.snapshot() if path.endswith(".json") else METRICS.to_prometheus()
+        return 404, {"error": f"no route for {path}"}
+
+    async def _query(self, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "body must be JSON"}
+        if not isinstance(data, dict):
+            return 400, {"error": "body must be a JSON object"}
+        text = data.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return 400, {"error": "'text' is required"}
+        session = data.get("session")
+        if not isinstance(session, str) or not session.strip():
+            return 400, {"error": "'session' is required, one id per conversation (e.g. \"telegram:1234\")"}
+
+        self.requests += 1
+        self.active += 1
+        try:
+            future = self.processor.submit_query(text, session)
+            response, keep_going = await asyncio.wait_for(asyncio.wrap_future(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            return 408, {"error": "query timed out", "session": session}
+        except Exception as e:
+            return 500, {"error": f"There was an error processing your request: {e}", "session": session}
+        finally:
+            self.active -= 1
+        return 200, {"response": response, "continue": keep_going, "session": session}
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "active": self.active,
+            "commands": len(self.processor.index),
+            "sessions": self.processor.sessions.stats(),
+            "result_cache": self.processor.cache_stats(),
+            "executor": self.processor.executor_stats(),
+            "matching": self.processor.match_stats(),
+        }
+
+
+async def _purge_sessions(processor, every=60.0):
+    while True:
+        await asyncio.sleep(every)
+        processor.sessions.purge()
+
+
+def run_server(processor=None, host="127.0.0.1", port=8765):
+    """
+    Blocking entry point (Bot's 'server' control mode, __main__).
+    """
+    owned = processor is None
+    processor = processor or MultiStageProcessor()
+    server = AthenaServer(processor, host, port)
+
+    async def _main():
+        purger = asyncio.ensure_future(_purge_sessions(processor))
+        try:
+            await server.serve_forever()
+        finally:
+            purger.cancel()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        print("[Server] Stopped.")
+    finally:
+        if owned:
+            processor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATHENA HTTP/JSON server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tools", default="config/tools.json", help="tools manifest")
+    parser.add_argument("--session-ttl", type=float, default=300, help="seconds before a pending conversation is dropped")
+    parser.add_argument("--no-reload", action="store_true", help="don't watch tools for changes")
+    args = parser.parse_args(argv)
+
+    processor = MultiStageProcessor(args.tools, session_ttl=args.session_ttl)
+    watcher = None if args.no_reload else ToolWatcher(processor).start()
+    try:
+        run_server(processor, args.host, args.port)
+    finally:
+        if watcher:
+            watcher.stop()
+        processor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class SessionStore:
+    """
+    Per-session slot-filling context, bounded by TTL and size.
+
+    Each conversation (a chat id, a household member, the local console)
+    keeps at most one pending command: (intent, cmd, params, missing).
+    Entries expire ttl seconds after they were last touched, and the least
+    recently used session is evicted once maxsize is reached, so abandoned
+    conversations don't pile up in a long-running server.
+    """
+
+    def __init__(self, ttl=300, maxsize=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data = OrderedDict()   # session -> (expires_at, context)
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, session):
+        """
+        Pending context for this session, or None (missing or expired).
+        """
+        with self._lock:
+            entry = self._data.get(session)
+            if entry is None:
+                return None
+            expires_at, context = entry
+            if expires_at <= self._clock():
+                del self._data[session]
+                self.expired += 1
+                return None
+            return context
+
+    def set(self, session, context):
+        """
+        Store (or with None, clear) the session's context and refresh its TTL.
+        """
+        if context is None:
+            return self.pop(session)
+        with self._lock:
+            self._data[session] = (self._clock() + self.ttl, context)
+            self._data.move_to_end(session)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evicted += 1
+        return None
+
+    def pop(self, session):
+        with self._lock:
+            entry = self._data.pop(session, None)
+            return entry[1] if entry else None
+
+    def purge(self):
+        """
+        Drop every expired session. Returns how many were removed.
+        """
+        now = self._clock()
+        with self._lock:
+            doomed = [s for s, (expires_at, _) in self._data.items() if expires_at <= now]
+            for s in doomed:
+                del self._data[s]
+            self.expired += len(doomed)
+            return len(doomed)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class InvertedIndexMatcher:
+    """
+    Top-k cosine matcher over an L2-normalized TF-IDF example matrix.
+
+    The matrix is stored column-wise as term -> posting list (rows, weights),
+    together with each term's maximum weight. A query only touches the
+    posting lists of its own n-grams, processed in decreasing order of
+    their score upper bound (query weight x max posting weight).
+
+    Max-score pruning: once k candidates exist and the summed upper bound
+    of the remaining terms can't reach the current k-th best score, rows
+    not seen yet can no longer make the top k, so the remaining lists only
+    update rows that are already candidates.
+
+    Scores accumulate in a per-thread scratch buffer allocated once; a
+    query only resets the rows it touched (its candidates), so its cost
+    follows the posting lists it reads, not the number of examples.
+    """
+
+    def __init__(self, matrix):
+        csc = sp.csc_matrix(matrix, dtype=np.float64)
+        csc.sort_indices()
+        self.n_rows, self.n_terms = csc.shape
+        self.indptr = csc.indptr
+        self.rows = csc.indices
+        self.weights = csc.data
+
+        self.max_weight = np.zeros(self.n_terms)
+        nonempty = np.flatnonzero(np.diff(self.indptr))
+        if nonempty.size:
+            self.max_weight[nonempty] = np.maximum.reduceat(self.weights, self.indptr[nonempty])
+        self._scratch = threading.local()
+
+    def _buffers(self):
+        scratch = self._scratch
+        if getattr(scratch, "acc", None) is None:
+            scratch.acc = np.zeros(self.n_rows)
+            scratch.seen = np.zeros(self.n_rows, dtype=bool)
+        return scratch.acc, scratch.seen
+
+    def top_k(self, query, k=1):
+        """
+        query: 1 x n_terms sparse row (already L2-normalized by the vectorizer).
+        Returns [(row, score), ...] best first; rows sharing no term are never scored.
+        """
+        query = sp.csr_matrix(query)
+        terms, qweights = query.indices, query.data
+        if not terms.size or not self.n_rows:
+            return []
+
+        bounds = qweights * self.max_weight[terms]
+        order = np.argsort(-bounds, kind="stable")
+        # remaining[i] = best score a row could still gain from terms order[i:]
+        remaining = np.cumsum(bounds[order][::-1])[::-1]
+
+        acc, seen = self._buffers()
+        candidates = []
+        n_candidates = 0
+        threshold = 0.0
+
+        for i, t in enumerate(order):
+            term = terms[t]
+            lo, hi = self.indptr[term], self.indptr[term + 1]
+            if lo == hi:
+                continue
+            rows = self.rows[lo:hi]
+            vals = self.weights[lo:hi]
+
+            if n_candidates >= k and remaining[i] < threshold:
+                keep = seen[rows]
+                if not keep.any():
+                    continue
+                rows, vals = rows[keep], vals[keep]
+            else:
+                new = rows[~seen[rows]]
+                if new.size:
+                    seen[new] = True
+                    candidates.append(new)
+                    n_candidates += new.size
+
+            acc[rows] += qweights[t] * vals
+
+            if n_candidates >= k:
+                cand = np.concatenate(candidates) if len(candidates) > 1 else candidates[0]
+                candidates = [cand]
+                threshold = np.partition(acc[cand], n_candidates - k)[n_candidates - k]
+
+        if not n_candidates:
+            return []
+        cand = np.concatenate(candidates)
+        scores = acc[cand]
+        # every row that was scored is a candidate: put the buffers back for the next query
+        acc[cand] = 0.0
+        seen[cand] = False
+        if cand.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            cand, scores = cand[top], scores[top]
+        best = np.lexsort((cand, -scores))  # highest score first, lowest row on ties
+        return [(int(cand[j]), float(scores[j])) for j in best]
@@ -0,0 +1,181 @@
+"""
+Local mirror of the user's Spotify library (liked songs, playlists, last
+known playback state), kept in one JSON file so playback commands are
+answered from memory instead of a Web API round trip.
+
+  - first sync: the saved-tracks total comes with page one, the remaining
+    pages (50 tracks each) are fetched concurrently by a bounded pool
+  - later syncs: pages are read newest-first only until a track older
+    than the newest one we have (added_at) shows up; if the total then
+    doesn't add up (tracks were un-liked) it falls back to a full sync
+  - playlists are small and fetched in full, also page-concurrently
+
+Works with anything that quacks like spotipy.Spotify (a stand-in API
+server only needs to serve the endpoints used here).
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_SIZE = 50      # Web API maximum for saved tracks and playlists
+
+
+class SpotifyLibrary:
+    def __init__(self, path, workers=4):
+        self.path = path
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.tracks = []        # newest first: {"uri", "name", "artist", "added_at"}
+        self.playlists = {}     # lower-cased name -> {"id", "uri", "name", "tracks"}
+        self.playback = {}      # {"is_playing", "volume", "device_id", "track_uri", "updated"}
+        self.synced_at = 0.0
+        self._uris = []
+        self.load()
+
+    # ---------------- disk ----------------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        with self._lock:
+            self.tracks = data.get("tracks", [])
+            self.playlists = data.get("playlists", {})
+            self.playback = data.get("playback", {})
+            self.synced_at = data.get("synced_at", 0.0)
+            self._uris = [t["uri"] for t in self.tracks]
+        return True
+
+    def save(self):
+        with self._lock:
+            blob = json.dumps({"synced_at": self.synced_at, "tracks": self.tracks,
+                               "playlists": self.playlists, "playback": self.playback})
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[SPOTIFY] ⚠️ Could not write library cache: {e}")
+
+    # ---------------- lookups (memory only) ----------------
+    def track_uris(self, limit=None):
+        uris = self._uris
+        return uris if limit is None else uris[:limit]
+
+    def playlist(self, name):
+        return self.playlists.get((name or "").strip().lower())
+
+    def remember_playback(self, **state):
+        with self._lock:
+            self.playback = {**self.playback, **state, "updated": time.time()}
+
+    def age(self):
+        return time.time() - self.synced_at if self.synced_at else float("inf")
+
+    # ---------------- sync ----------------
+    def sync(self, sp, full=False):
+        """
+        Bring the mirror up to date and persist it. Returns
+        {"mode", "tracks", "new", "playlists", "seconds"}.
+        """
+        with self._sync_lock:
+            t0 = time.perf_counter()
+            first = sp.current_user_saved_tracks(limit=PAGE_SIZE, offset=0)
+            total = first.get("total", 0)
+
+            mode, new = "incremental", 0
+            if full or not self.tracks:
+                mode, tracks = "full", self._fetch_all_tracks(sp, first, total)
+            else:
+                tracks, new = self._fetch_new_tracks(sp, first)
+                if len(tracks) != total:
+                    mode, tracks = "full", self._fetch_all_tracks(sp, first, total)
+            playlists = self._fetch_playlists(sp)
+
+            with self._lock:
+                if mode == "full":
+                    new = len({t["uri"] for t in tracks} - set(self._uris))
+                self.tracks = tracks
+                self._uris = [t["uri"] for t in tracks]
+                self.playlists = playlists
+                self.synced_at = time.time()
+            self.save()
+            return {"mode": mode, "tracks": len(tracks), "new": new, "playlists": len(playlists),
+                    "seconds": time.perf_counter() - t0}
+
+    def _fetch_all_tracks(self, sp, first, total):
+        offsets = range(PAGE_SIZE, total, PAGE_SIZE)
+        pages = self._fetch_pages(lambda offset: sp.current_user_saved_tracks(limit=PAGE_SIZE, offset=offset),
+                                  offsets)
+        tracks = []
+        for page in [first, *pages]:
+            tracks.extend(_track(item) for item in page.get("items", []) if item.get("track"))
+        return tracks
+
+    def _fetch_new_tracks(self, sp, first):
+        """
+        Newest-first pages until we reach tracks we already have.
+        Returns (merged track list, number of new tracks).
+        """
+        known = set(self._uris)
+        newest = self.tracks[0]["added_at"] if self.tracks else ""
+        fresh, page, offset = [], first, 0
+        while True:
+            items = [item for item in page.get("items", []) if item.get("track")]
+            for item in items:
+                track = _track(item)
+                if track["added_at"] < newest or (track["added_at"] == newest and track["uri"] in known):
+                    return self._merge(fresh), len(fresh)
+                if track["uri"] not in known:
+                    fresh.append(track)
+            offset += PAGE_SIZE
+            if not page.get("next") or not items:
+                return self._merge(fresh), len(fresh)
+            page = sp.current_user_saved_tracks(limit=PAGE_SIZE, offset=offset)
+
+    def _merge(self, fresh):
+        uris = {t["uri"] for t in fresh}
+        return fresh + [t for t in self.tracks if t["uri"] not in uris]
+
+    def _fetch_playlists(self, sp):
+        first = sp.current_user_playlists(limit=PAGE_SIZE, offset=0)
+        offsets = range(PAGE_SIZE, first.get("total", 0), PAGE_SIZE)
+        pages = self._fetch_pages(lambda offset: sp.current_user_playlists(limit=PAGE_SIZE, offset=offset), offsets)
+        playlists = {}
+        for page in [first, *pages]:
+            for item in page.get("items", []):
+                if not item or not item.get("name"):
+                    continue
+                playlists.setdefault(item["name"].strip().lower(), {
+                    "id": item.get("id"), "uri": item.get("uri"), "name": item["name"],
+                    "tracks": (item.get("tracks") or {}).get("total", 0),
+                })
+        return playlists
+
+    def _fetch_pages(self, fetch, offsets):
+        """
+        fetch(offset) for every offset on at most `workers` threads, in offset order.
+        """
+        offsets = list(offsets)
+        if not offsets:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(offsets)),
+                                thread_name_prefix="athena-spotify-sync") as pool:
+            return list(pool.map(fetch, offsets))
+
+
+def _track(item):
+    track = item["track"]
+    artists = track.get("artists") or []
+    return {
+        "uri": track["uri"],
+        "name": track.get("name", ""),
+        "artist": artists[0].get("name", "") if artists else "",
+        "added_at": item.get("added_at", ""),
+    }
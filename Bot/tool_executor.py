@@ -0,0 +1,180 @@
+import asyncio
+import inspect
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Expired(Exception):
+    """The executor's own timeout ran out (not a timeout raised by the tool)."""
+
+
+class ToolExecutor:
+    """
+    Runs tool functions for the processor.
+
+    - async tools run on the calling loop; sync tools (blocking HTTP
+      clients like weather or Spotify) run on a bounded thread pool so
+      they never stall the event loop.
+    - each command can declare a "timeout" in its TOOL_SPEC; async calls
+      are cancelled when it expires. A sync call can't be interrupted, so
+      the caller gets the timeout while the thread finishes in the
+      background, still holding its concurrency slot.
+    - each tool gets a semaphore ("max_concurrency" in TOOL_SPEC, else
+      default_concurrency) so one laggy API can't take every worker
+      thread or flood a device.
+
+    stats() reports queue depth and time spent waiting for a slot/thread.
+    """
+
+    def __init__(self, max_workers=8, default_concurrency=4):
+        self.max_workers = max_workers
+        self.default_concurrency = default_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="athena-tool")
+        self._limits = weakref.WeakKeyDictionary()   # loop -> {intent: Semaphore}
+        self._lock = threading.Lock()
+        self._stats = {}                             # intent -> counters
+        self._queued = 0                             # submitted to the pool, not started yet
+
+    def _semaphore(self, intent, limit):
+        loop = asyncio.get_running_loop()
+        per_loop = self._limits.setdefault(loop, {})
+        sem = per_loop.get(intent)
+        if sem is None:
+            sem = per_loop[intent] = asyncio.Semaphore(limit or self.default_concurrency)
+        return sem
+
+    def _tool_stats(self, intent):
+        stats = self._stats.get(intent)
+        if stats is None:
+            stats = self._stats[intent] = {"calls": 0, "errors": 0, "timeouts": 0, "active": 0, "waiting": 0,
+                                           "wait_total_s": 0.0, "wait_max_s": 0.0, "run_total_s": 0.0}
+        return stats
+
+    def _record(self, intent, **deltas):
+        with self._lock:
+            stats = self._tool_stats(intent)
+            for name, delta in deltas.items():
+                if name == "wait_max_s":
+                    stats[name] = max(stats[name], delta)
+                else:
+                    stats[name] += delta
+
+    async def run(self, intent, func, kwargs, timeout=None, max_concurrency=None):
+        """
+        Call func(**kwargs) under the tool's limits. Raises TimeoutError
+        after `timeout` seconds (None/0 = no limit); anything the tool
+        raises itself (its own TimeoutError included) propagates unchanged.
+        """
+        timeout = timeout or None
+        queued_at = time.perf_counter()
+        sem = self._semaphore(intent, max_concurrency)
+        self._record(intent, calls=1, waiting=1)
+        try:
+            await sem.acquire()
+        except asyncio.CancelledError:
+            self._record(intent, waiting=-1)
+            raise
+        release = sem.release
+
+        try:
+            if inspect.iscoroutinefunction(func):
+                self._started(intent, queued_at)
+                coro = func(**kwargs)
+            else:
+                coro, release = self._in_thread(intent, func, kwargs, queued_at, sem)
+            started = time.perf_counter()
+            deadline = started + timeout if timeout else None
+            try:
+                result = await self._until(coro, deadline)
+                if asyncio.iscoroutine(result):   # sync wrapper handed back a coroutine
+                    result = await self._until(result, deadline)
+                return result
+            except _Expired:
+                self._record(intent, timeouts=1)
+                raise TimeoutError(f"{intent} took longer than {timeout:g}s") from None
+            except Exception:
+                self._record(intent, errors=1)
+                raise
+            finally:
+                self._record(intent, run_total_s=time.perf_counter() - started)
+        finally:
+            if release:
+                release()
+                self._record(intent, active=-1)
+
+    @staticmethod
+    async def _until(awaitable, deadline):
+        """
+        Await with the executor's deadline (None = none). Only running out
+        of time raises _Expired; the awaitable's own exceptions pass
+        through as they are.
+        """
+        if deadline is None:
+            return await awaitable
+        task = asyncio.ensure_future(awaitable)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=max(0.0, deadline - time.perf_counter()))
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if not done:
+            task.cancel()
+            raise _Expired()
+        return task.result()
+
+    def _started(self, intent, queued_at):
+        waited = time.perf_counter() - queued_at
+        self._record(intent, waiting=-1, active=1, wait_total_s=waited, wait_max_s=waited)
+
+    def _in_thread(self, intent, func, kwargs, queued_at, sem):
+        """
+        Submit a sync call to the pool. Returns (awaitable, release): the
+        semaphore is released when the thread finishes instead of by the
+        caller, so a timed-out call keeps its slot until it really ends.
+        A call that times out before a worker picks it up is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        started = threading.Event()
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+            started.set()
+            self._started(intent, queued_at)
+            return func(**kwargs)
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(sem.release)
+            except RuntimeError:   # loop already closed
+                pass
+            if started.is_set():
+                self._record(intent, active=-1)
+            else:
+                with self._lock:
+                    self._queued -= 1
+                self._record(intent, waiting=-1)
+
+        with self._lock:
+            self._queued += 1
+        future = self._pool.submit(call)
+        future.add_done_callback(done)
+        return asyncio.wrap_future(future, loop=loop), None
+
+    def stats(self):
+        with self._lock:
+            tools = {}
+            for intent, s in self._stats.items():
+                finished = s["calls"] - s["waiting"]
+                tools[intent] = {**s, "wait_avg_s": (s["wait_total_s"] / finished) if finished else 0.0}
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": sum(s["waiting"] for s in self._stats.values()),   # slot or thread
+                "pool_queued": self._queued,
+                "tools": tools,
+            }
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,9 +1,36 @@
+import ast
 import importlib
+import importlib.util
 import json
 import os
+import sys
 import traceback
 
 
+class _LazyCommand:
+    """
+    Stand-in for a tool function whose module hasn't been imported yet.
+    The module is imported the first time the command is called.
+    """
+    def __init__(self, registry, intent, func_name, is_async=False):
+        self.registry = registry
+        self.intent = intent
+        self.func_name = func_name
+        self.is_async = is_async
+
+    def resolve(self):
+        module = self.registry.get_tool(self.intent)
+        if module is None:
+            raise RuntimeError(f"tool '{self.intent}' could not be imported")
+        return getattr(module, self.func_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<lazy {self.registry.module_paths.get(self.intent)}.{self.func_name}>"
+
+
 class ToolRegistry:
     """
     Loads tools from a manifest (config/tools.json) that maps intent -> module path.
@@ -15,16 +42,37 @@ class ToolRegistry:
                 "examples": [...],
                 "params": [...],          # params expected by the function
                 "defaults": {...},        # <-- NEW: default values if not provided
-                "function": "func_name"
+                "function": "func_name",
+                "cache_ttl": 600,         # optional: cache results for N seconds
+                "cache_key": [...],       # optional: params the cached result depends on (default: "params")
+                "invalidates": [...],     # optional: commands ("cmd" or "intent.cmd") whose cached results this one clears
+                "timeout": 10             # optional: seconds before the call is abandoned (overrides the tool's)
             }, ...
+        },
+        "timeout": 10,                    # optional: default timeout for every command of the tool
+        "max_concurrency": 2,             # optional: calls of this tool allowed in flight at once
+        "vocabulary": {                   # optional: phrases for the shared entity gazetteer
+            "label": [...] or {"value": [...phrases]}
         }
     }
+
+    With lazy=True (default) a tool module is NOT imported at startup: its
+    TOOL_SPEC is read from the source as a literal (and cached in
+    .tool_specs.json next to the manifest), and the module is imported
+    the first time one of its commands is used. Tools whose TOOL_SPEC
+    isn't a plain literal are imported eagerly as before.
     """
-    def __init__(self, tools_manifest="config/tools.json"):
+    def __init__(self, tools_manifest="config/tools.json", lazy=True):
         self.manifest_path = tools_manifest
-        self.tools = {}      # intent -> module
+        self.lazy = lazy
+        self.tools = {}      # intent -> module (imported tools only)
+        self.module_paths = {}  # intent -> module path
         # commands[(intent, cmd)] = (func, examples, params, defaults)
         self.commands = {}
+        # options[(intent, cmd)] = optional per-command execution settings
+        self.options = {}
+        self.vocabularies = {}  # intent -> TOOL_SPEC["vocabulary"]
+        self.spec_cache_path = os.path.join(os.path.dirname(os.path.abspath(tools_manifest)), ".tool_specs.json")
         self._load_from_manifest()
 
     # ------------------------------------------------------------------
@@ -34,48 +82,337 @@ class ToolRegistry:
             return
 
         try:
-            with open(self.manifest_path, "r", encoding="utf-8") as f:
-                manifest = json.load(f)
+            manifest = self._read_manifest()
         except Exception as e:
             print(f"[ToolRegistry] ❌ Failed to parse tools.json: {e}")
             return
 
         loaded_tools = 0
         loaded_cmds = 0
+        spec_cache = self._read_spec_cache() if self.lazy else {}
+        spec_cache_dirty = False
 
         for intent, module_path in manifest.items():
+            count, fresh = self._load_tool(intent, module_path, spec_cache)
+            spec_cache_dirty |= fresh
+            if count is None:
+                continue
+            loaded_tools += 1
+            loaded_cmds += count
+
+        if spec_cache_dirty:
+            self._write_spec_cache(spec_cache)
+        print(f"[ToolRegistry DEBUG] Loaded {loaded_tools} tools and {loaded_cmds} commands.")
+
+    def _read_manifest(self):
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict):
+            raise ValueError("tools.json must map intent -> module path")
+        return manifest
+
+    def _load_tool(self, intent, module_path, spec_cache, reload=False, before_reload=None):
+        """
+        Register one tool, from its source (lazy) or by importing it.
+        With reload=True an already-imported module is re-executed so its
+        new code is used (before_reload() is called right before that).
+        Returns (commands registered or None, spec cache updated).
+        """
+        self.module_paths[intent] = module_path
+        static, fresh = None, False
+        if self.lazy and not (reload and module_path in sys.modules):
+            static, fresh = self._read_static_spec(module_path, spec_cache)
+
+        if static:
+            spec, defined = static["spec"], static["functions"]
+            module = None
+        else:
             try:
-                module = importlib.import_module(module_path)
+                if reload and module_path in sys.modules:
+                    if before_reload:
+                        before_reload()
+                    module = importlib.reload(sys.modules[module_path])
+                else:
+                    module = importlib.import_module(module_path)
             except Exception as e:
                 print(f"[ToolRegistry] ❌ Failed to import {module_path}: {e}")
                 traceback.print_exc()
-                continue
+                return None, fresh
+            spec, defined = getattr(module, "TOOL_SPEC", None), None
 
-            spec = getattr(module, "TOOL_SPEC", None)
-            if not spec or "commands" not in spec:
-                print(f"[ToolRegistry] ⚠️ TOOL_SPEC missing/invalid in {module_path}")
-                continue
+        count = self._register_tool(intent, module_path, spec, module, defined)
+        if count is not None:
+            print(f"[ToolRegistry] ✅ Registered tool: {intent}{'' if module else ' (lazy)'}")
+        return count, fresh
 
+    def _register_tool(self, intent, module_path, spec, module=None, defined=None):
+        """
+        Register every command of one tool. `defined` maps function name ->
+        is_async for tools registered from source without importing them.
+        Returns the number of commands registered, or None if the spec is invalid.
+        """
+        if not spec or "commands" not in spec:
+            print(f"[ToolRegistry] ⚠️ TOOL_SPEC missing/invalid in {module_path}")
+            return None
+
+        if module is not None:
             self.tools[intent] = module
-            loaded_tools += 1
+        else:
+            self.tools.pop(intent, None)
+        if spec.get("vocabulary"):
+            self.vocabularies[intent] = spec["vocabulary"]
+        else:
+            self.vocabularies.pop(intent, None)
 
-            for cmd, meta in spec["commands"].items():
-                func_name = meta.get("function")
-                examples = meta.get("examples", [])
-                params = meta.get("params", [])  # list of param names
-                defaults = meta.get("defaults", {})  # NEW field
+        count = 0
+        for cmd, meta in spec["commands"].items():
+            func_name = meta.get("function")
+            examples = meta.get("examples", [])
+            params = meta.get("params", [])  # list of param names
+            defaults = meta.get("defaults", {})  # NEW field
 
+            if module is not None:
                 if not func_name or not hasattr(module, func_name):
                     print(f"[ToolRegistry] ⚠️ Missing function for {intent}.{cmd}")
                     continue
-
                 func = getattr(module, func_name)
-                self.commands[(intent, cmd)] = (func, examples, params, defaults)
-                loaded_cmds += 1
+            else:
+                if not func_name or func_name not in defined:
+                    print(f"[ToolRegistry] ⚠️ Missing function for {intent}.{cmd}")
+                    continue
+                func = _LazyCommand(self, intent, func_name, defined[func_name])
 
-            print(f"[ToolRegistry] ✅ Registered tool: {intent}")
+            self.commands[(intent, cmd)] = (func, examples, params, defaults)
+            self.options[(intent, cmd)] = self._parse_options(intent, meta, params, spec)
+            count += 1
 
-        print(f"[ToolRegistry DEBUG] Loaded {loaded_tools} tools and {loaded_cmds} commands.")
+        # a re-registered tool may have dropped commands
+        for key in [k for k in self.commands if k[0] == intent and k[1] not in spec["commands"]]:
+            self.commands.pop(key, None)
+            self.options.pop(key, None)
+        return count
+
+    # ------------------------------------------------------------------
+    # Reloading (see tool_watcher)
+    # ------------------------------------------------------------------
+    def unregister_tool(self, intent):
+        for key in [k for k in self.commands if k[0] == intent]:
+            self.commands.pop(key, None)
+            self.options.pop(key, None)
+        self.vocabularies.pop(intent, None)
+        self.tools.pop(intent, None)
+        self.module_paths.pop(intent, None)
+
+    def reload_tool(self, intent, before_reload=None):
+        """
+        Re-read one tool after its source changed. New commands are
+        written over the old ones before stale ones are dropped, so a
+        concurrent lookup never finds the tool missing. Returns False
+        (previous version kept) if the new source can't be loaded.
+
+        An imported tool's new source is compiled and test-imported first;
+        only then is before_reload() called (to release the live module's
+        resources) and the module re-executed.
+        """
+        module_path = self.module_paths.get(intent)
+        if module_path is None:
+            return False
+        source = self.source_path(intent)
+        if source and not self._compiles(source):
+            print(f"[ToolRegistry] ⚠️ {source} doesn't compile; keeping previous version of {intent}")
+            return False
+        if module_path in sys.modules and source and not self._imports(module_path, source):
+            print(f"[ToolRegistry] ⚠️ {source} doesn't import; keeping previous version of {intent}")
+            return False
+        spec_cache = self._read_spec_cache() if self.lazy else {}
+        count, fresh = self._load_tool(intent, module_path, spec_cache, reload=True, before_reload=before_reload)
+        if fresh:
+            self._write_spec_cache(spec_cache)
+        if count is None:
+            print(f"[ToolRegistry] ⚠️ Keeping previous version of {intent}")
+            return False
+        return True
+
+    def reload_manifest(self):
+        """
+        Re-read tools.json: register new tools, drop removed ones, and
+        reload tools whose module path changed. Returns the set of
+        intents affected.
+        """
+        try:
+            manifest = self._read_manifest()
+        except (OSError, ValueError) as e:
+            print(f"[ToolRegistry] ❌ Failed to parse tools.json, keeping current tools: {e}")
+            return set()
+
+        changed = set()
+        for intent in [i for i in self.module_paths if i not in manifest]:
+            self.unregister_tool(intent)
+            changed.add(intent)
+            print(f"[ToolRegistry] Removed tool: {intent}")
+
+        spec_cache = self._read_spec_cache() if self.lazy else {}
+        dirty = False
+        for intent, module_path in manifest.items():
+            if self.module_paths.get(intent) == module_path:
+                continue
+            if intent in self.module_paths:
+                self.unregister_tool(intent)
+            _, fresh = self._load_tool(intent, module_path, spec_cache, reload=True)
+            dirty |= fresh
+            changed.add(intent)
+        if dirty:
+            self._write_spec_cache(spec_cache)
+        return changed
+
+    @staticmethod
+    def _compiles(source):
+        try:
+            with open(source, "r", encoding="utf-8") as f:
+                compile(f.read(), source, "exec")
+            return True
+        except (OSError, SyntaxError, ValueError):
+            return False
+
+    @staticmethod
+    def _imports(module_path, source):
+        """
+        Execute the source in a throwaway module (not in sys.modules) to
+        check that it imports, without touching the live one.
+        """
+        try:
+            spec = importlib.util.spec_from_file_location(module_path, source)
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+            return True
+        except Exception as e:
+            print(f"[ToolRegistry] ❌ {module_path} fails to import: {e}")
+            return False
+
+    def source_path(self, intent):
+        """
+        File a tool is loaded from (None if it can't be located).
+        """
+        module = self.tools.get(intent)
+        path = getattr(module, "__file__", None)
+        if path is None and intent in self.module_paths:
+            try:
+                path = getattr(importlib.util.find_spec(self.module_paths[intent]), "origin", None)
+            except Exception:
+                path = None
+        return os.path.abspath(path) if path and os.path.isfile(path) else None
+
+    @staticmethod
+    def _parse_options(intent, meta, params, spec=None):
+        invalidates = []
+        for target in meta.get("invalidates", []):
+            # "cmd" means a command of this same tool
+            target_intent, _, target_cmd = target.rpartition(".")
+            invalidates.append((target_intent or intent, target_cmd))
+        return {
+            "cache_ttl": float(meta.get("cache_ttl") or 0),
+            "cache_key": list(meta.get("cache_key", params)),
+            "invalidates": invalidates,
+            "timeout": float(meta.get("timeout", (spec or {}).get("timeout")) or 0),
+            "max_concurrency": int((spec or {}).get("max_concurrency") or 0),
+        }
+
+    # ------------------------------------------------------------------
+    # Spec-only loading (no import)
+    # ------------------------------------------------------------------
+    def _read_static_spec(self, module_path, spec_cache):
+        """
+        Returns ({"spec", "functions"} or None, cache_updated).
+        """
+        try:
+            found = importlib.util.find_spec(module_path)
+        except Exception:
+            found = None
+        source = getattr(found, "origin", None)
+        if not source or not source.endswith(".py") or not os.path.isfile(source):
+            return None, False
+
+        st = os.stat(source)
+        cached = spec_cache.get(module_path)
+        if cached and cached.get("source") == source and cached.get("mtime_ns") == st.st_mtime_ns \
+                and cached.get("size") == st.st_size:
+            return cached, False
+
+        static = self._parse_static_spec(source)
+        if static is None:
+            spec_cache.pop(module_path, None)
+            return None, False
+        spec_cache[module_path] = {"source": source, "mtime_ns": st.st_mtime_ns, "size": st.st_size, **static}
+        return spec_cache[module_path], True
+
+    @staticmethod
+    def _parse_static_spec(source):
+        """
+        Pull a literal TOOL_SPEC and the top-level function names out of a
+        module's source. Returns None if TOOL_SPEC isn't a plain literal.
+        """
+        try:
+            with open(source, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=source)
+        except (OSError, SyntaxError, ValueError):
+            return None
+
+        spec, functions = None, {}
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                functions[node.name] = isinstance(node, ast.AsyncFunctionDef)
+            elif isinstance(node, ast.Assign) and any(
+                    isinstance(t, ast.Name) and t.id == "TOOL_SPEC" for t in node.targets):
+                try:
+                    spec = ast.literal_eval(node.value)
+                except ValueError:
+                    return None
+            elif ToolRegistry._touches_spec(node):
+                return None  # TOOL_SPEC is modified at import time; needs the real module
+
+        if not isinstance(spec, dict):
+            return None
+        try:
+            json.dumps(spec)
+        except (TypeError, ValueError):
+            return None
+        return {"spec": spec, "functions": functions}
+
+    @staticmethod
+    def _touches_spec(node):
+        """
+        True for top-level statements like TOOL_SPEC["x"] = ... or TOOL_SPEC["commands"].update(...).
+        """
+        if isinstance(node, ast.Assign):
+            targets = [t for t in node.targets if not isinstance(t, ast.Name)]
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+            targets = [node.target]
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            targets = [node.value.func]
+        else:
+            return False
+        for target in targets:
+            while isinstance(target, (ast.Subscript, ast.Attribute)):
+                target = target.value
+            if isinstance(target, ast.Name) and target.id == "TOOL_SPEC":
+                return True
+        return False
+
+    def _read_spec_cache(self):
+        try:
+            with open(self.spec_cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_spec_cache(self, spec_cache):
+        tmp = f"{self.spec_cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(spec_cache, f)
+            os.replace(tmp, self.spec_cache_path)
+        except OSError as e:
+            print(f"[ToolRegistry] ⚠️ Could not write spec cache: {e}")
 
     # ------------------------------------------------------------------
     def get_all_examples(self):
@@ -87,11 +424,59 @@ class ToolRegistry:
             examples_by_intent.setdefault(intent, {})[cmd] = examples
         return examples_by_intent
 
+    def get_vocabulary(self):
+        """
+        Merge every tool's vocabulary into {label: {value: [phrases...]}}.
+        """
+        merged = {}
+        for vocab in self.vocabularies.values():
+            for label, entries in vocab.items():
+                bucket = merged.setdefault(label, {})
+                if not isinstance(entries, dict):
+                    entries = {phrase: [phrase] for phrase in entries}
+                for value, phrases in entries.items():
+                    known = bucket.setdefault(value, [])
+                    for phrase in ([phrases] if isinstance(phrases, str) else phrases):
+                        if phrase not in known:
+                            known.append(phrase)
+        return merged
+
     def get_tool(self, intent):
-        return self.tools.get(intent)
+        """
+        Returns the tool module, importing it on first use.
+        """
+        module = self.tools.get(intent)
+        if module is not None or intent not in self.module_paths:
+            return module
+        module_path = self.module_paths[intent]
+        try:
+            module = importlib.import_module(module_path)
+        except Exception as e:
+            print(f"[ToolRegistry] ❌ Failed to import {module_path}: {e}")
+            traceback.print_exc()
+            return None
+        self.tools[intent] = module
+        return module
 
     def get_command_meta(self, intent, cmd):
         """
         Returns (func, examples, params, defaults) or None.
         """
         return self.commands.get((intent, cmd))
+
+    def get_callable(self, intent, cmd):
+        """
+        Returns the real tool function for a command (importing its module if needed).
+        """
+        meta = self.commands.get((intent, cmd))
+        if not meta:
+            return None
+        func = meta[0]
+        return func.resolve() if isinstance(func, _LazyCommand) else func
+
+    def get_command_options(self, intent, cmd):
+        """
+        Returns {"cache_ttl", "cache_key", "invalidates", "timeout", "max_concurrency"} for a command.
+        """
+        return self.options.get((intent, cmd)) or {"cache_ttl": 0.0, "cache_key": [], "invalidates": [],
+                                                   "timeout": 0.0, "max_concurrency": 0}
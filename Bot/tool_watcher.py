@@ -0,0 +1,99 @@
+import os
+import threading
+
+
+class ToolWatcher:
+    """
+    Polls tools.json and every tool's source file, and hot-reloads the
+    processor when one changes:
+
+      tools.json changed   -> processor.reload_tools()         (manifest diff)
+      Tools/x.py changed   -> processor.reload_tools(["x"])    (that tool only)
+
+    A change is applied once the file's (mtime, size) has been stable for
+    one poll, so an editor's partial write isn't picked up. Polling keeps
+    it dependency-free and works the same on Windows and Linux.
+    """
+
+    def __init__(self, processor, interval=1.0):
+        self.processor = processor
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._seen = {}      # path -> stat signature of the version currently loaded
+        self._pending = {}   # path -> signature seen on the last poll, not applied yet
+
+    def _targets(self):
+        """
+        {path: intent or None (the manifest)}
+        """
+        registry = self.processor.tool_registry
+        targets = {os.path.abspath(registry.manifest_path): None}
+        for intent in list(registry.module_paths):
+            path = registry.source_path(intent)
+            if path:
+                targets.setdefault(path, intent)
+        return targets
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._seen = {path: self._signature(path) for path in self._targets()}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="athena-tool-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[Watcher] ⚠️ reload failed: {e}")
+
+    def poll(self):
+        """
+        One pass: returns the reload info from the processor, or None.
+        """
+        targets = self._targets()
+        ready = []
+        for path, intent in targets.items():
+            sig = self._signature(path)
+            if path not in self._seen:          # tool added by a manifest change
+                self._seen[path] = sig
+                continue
+            if sig == self._seen[path]:
+                self._pending.pop(path, None)
+                continue
+            if self._pending.get(path) != sig:  # still being written; look again next poll
+                self._pending[path] = sig
+                continue
+            self._pending.pop(path, None)
+            self._seen[path] = sig
+            if sig is not None:
+                ready.append(intent)
+
+        if not ready:
+            return None
+        if None in ready:
+            info = self.processor.reload_tools()
+            # tools whose source also changed are picked up from their new source already
+            ready = [i for i in ready if i is not None and i in self.processor.tool_registry.module_paths
+                     and (info is None or i not in info["tools"])]
+            if not ready:
+                return info
+        return self.processor.reload_tools(ready)
@@ -0,0 +1,149 @@
+"""
+Offline voice path: transcribe recordings and match their intents without
+a microphone (CI, re-running the recorded command corpus).
+
+Files are decoded by a process pool, one Vosk model loaded per worker,
+through the same UtteranceDecoder the live recognizer uses. Each
+utterance is then matched in this process by one MultiStageProcessor
+(matching only: no tool is run). Per file it reports:
+
+  audio_s   length of the recording
+  asr_s     time spent inside Vosk
+  rtf       real-time factor, asr_s / audio_s
+  e2e_s     read + decode + intent match for the file
+
+    python Bot/transcribe.py recordings/ --workers 4 --output asr.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asr import UtteranceDecoder, audio_files, read_pcm, transcribe_pcm
+from voice_recognition import MODEL_PATH, strip_wake_word
+
+_decoder = None     # per worker process
+
+
+def _init_worker(model_path):
+    global _decoder
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    _decoder = UtteranceDecoder(Model(model_path))
+
+
+def _transcribe(path):
+    t0 = time.perf_counter()
+    try:
+        sentences, stats = transcribe_pcm(_decoder, read_pcm(path))
+    except (OSError, ValueError) as e:
+        return {"file": path, "error": str(e)}
+    return {"file": path, "sentences": sentences, "audio_s": stats["audio_s"], "asr_s": stats["decode_s"],
+            "worker_s": time.perf_counter() - t0}
+
+
+def _match(processor, result):
+    t0 = time.perf_counter()
+    matches = []
+    for sentence in result["sentences"]:
+        text = strip_wake_word(sentence)
+        intent, cmd, _, score = processor._best_match(text)
+        matched = intent is not None and score >= processor.threshold
+        params = processor._merge_params(intent, cmd, text)[0] if matched else {}
+        matches.append({"text": text, "intent": intent if matched else None, "command": cmd if matched else None,
+                        "score": round(float(score), 3), "params": params})
+    result["matches"] = matches
+    result["match_s"] = time.perf_counter() - t0
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def transcribe_files(paths, model_path=MODEL_PATH, workers=None, processor=None, on_result=None):
+    """
+    Decode every file on a process pool and (with a processor) match its
+    utterances. Returns (results in file order, summary).
+    """
+    files = audio_files(paths)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files) or 1))
+    t0 = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = {pool.submit(_transcribe, path): path for path in files}
+        for future in as_completed(futures):
+            result = future.result()
+            if "error" not in result:
+                if processor is not None:
+                    _match(processor, result)
+                result["e2e_s"] = result.pop("worker_s") + result.get("match_s", 0.0)
+                result["rtf"] = result["asr_s"] / result["audio_s"] if result["audio_s"] else 0.0
+            results[result["file"]] = result
+            if on_result:
+                on_result(result)
+    wall = time.perf_counter() - t0
+
+    ok = [r for r in results.values() if "error" not in r]
+    audio = sum(r["audio_s"] for r in ok)
+    e2e = [r["e2e_s"] for r in ok]
+    summary = {
+        "files": len(files), "failed": len(files) - len(ok), "workers": workers, "wall_s": wall,
+        "audio_s": audio, "asr_s": sum(r["asr_s"] for r in ok),
+        "rtf": sum(r["asr_s"] for r in ok) / audio if audio else 0.0,
+        "throughput_x": audio / wall if wall else 0.0,           # seconds of audio per wall second
+        "e2e_p50_s": _percentile(e2e, 0.5), "e2e_p95_s": _percentile(e2e, 0.95),
+    }
+    return [results[path] for path in files], summary
+
+
+def _print_result(result):
+    name = os.path.basename(result["file"])
+    if "error" in result:
+        print(f"{name:<32} ⚠️ {result['error']}")
+        return
+    if "matches" in result:
+        heard = [f"{m['text']} -> {m['intent']}.{m['command']}" if m["intent"] else f"{m['text']} -> ?"
+                 for m in result["matches"]]
+    else:
+        heard = result["sentences"]
+    heard = " | ".join(heard) or "(silence)"
+    print(f"{name:<32} {result['audio_s']:6.2f}s audio  asr {result['asr_s'] * 1000:7.1f} ms  "
+          f"rtf {result['rtf']:.3f}  e2e {result['e2e_s'] * 1000:7.1f} ms  {heard}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe and intent-match recorded commands")
+    parser.add_argument("paths", nargs="+", help="WAV / raw 16 kHz 16-bit mono PCM files or directories")
+    parser.add_argument("--model", default=MODEL_PATH, help="Vosk model directory (default: $ATHENA_VOSK_MODEL)")
+    parser.add_argument("--workers", type=int, default=None, help="decoder processes (default: CPU count)")
+    parser.add_argument("--tools", default="config/tools.json", help="tools manifest")
+    parser.add_argument("--no-match", action="store_true", help="transcribe only")
+    parser.add_argument("--output", help="write results + summary as JSON")
+    args = parser.parse_args(argv)
+
+    processor = None
+    if not args.no_match:
+        from multi_stage_processor import MultiStageProcessor
+        processor = MultiStageProcessor(args.tools)
+    try:
+        results, summary = transcribe_files(args.paths, args.model, args.workers, processor, _print_result)
+    finally:
+        if processor is not None:
+            processor.close()
+
+    print(f"\n{summary['files']} files ({summary['failed']} failed), {summary['audio_s']:.1f}s of audio "
+          f"in {summary['wall_s']:.2f}s on {summary['workers']} workers: rtf {summary['rtf']:.3f}, "
+          f"{summary['throughput_x']:.1f}x real time, e2e p50 {summary['e2e_p50_s'] * 1000:.1f} ms "
+          f"p95 {summary['e2e_p95_s'] * 1000:.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
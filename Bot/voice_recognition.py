@@ -1,57 +1,166 @@
-from vosk import Model, KaldiRecognizer
-import pyaudio
+import os
 import random
+import time
+from collections import deque
+from asr import UtteranceDecoder, audio_files, read_pcm, transcribe_pcm
+from audio_worker import AudioWorker
+from metrics import METRICS
+
+# Vosk model directory; defaults to the small English model next to this file
+MODEL_PATH = os.environ.get("ATHENA_VOSK_MODEL",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "vosk-model-small-en-us-0.15"))
+ACTION_WORDS = ["athena", "computer", "jarvis"]
+END_WORDS = ["stop", "end", "goodbye", "goodnight", "good night"]
+WORKER_WORDS = ["Boss", "Love", "Sir"]
+
+
+def strip_wake_word(sentence, action_words=ACTION_WORDS):
+    """
+    "athena turn off the lights" -> "turn off the lights" (a bare wake word is kept).
+    """
+    for word in action_words:
+        if sentence.startswith(word + " "):
+            return sentence[len(word):].strip()
+    return sentence
+
 
 class VoiceRecognition:
-    def __init__(self, model_path, action_words, end_words, worker_words):
-        self.model = Model(model_path)
-        self.recognizer = KaldiRecognizer(self.model, 16000)
-        self.mic = pyaudio.PyAudio()
-        self.stream = self.mic.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=16384)  # Increased buffer size to prevent overflow
-        self.stream.start_stream()
+    """
+    Front end for the out-of-process audio pipeline (see audio_worker).
+    Capture and Vosk decoding run in worker processes; listen() only
+    waits for finished utterances, so the microphone keeps being read
+    while ATHENA matches intents and runs tools.
+
+    With wake_word_gating the full model only runs for wake_window
+    seconds after one of the action_words is heard.
+    """
+
+    def __init__(self, model_path, action_words, end_words, worker_words, wake_word_gating=True, wake_window=8.0):
+        self.worker = AudioWorker(model_path, wake_words=action_words if wake_word_gating else None,
+                                  wake_window=wake_window)
+        self.worker.start()
 
         self.action_words = action_words
         self.end_words = end_words
         self.worker_words = worker_words
 
-    def listen(self):
+    def listen(self, on_partial=None):
+        """
+        Blocks until a full utterance is recognised. on_partial(text), if
+        given, is called with in-progress hypotheses while the user speaks.
+
+        Records how long we blocked on the audio worker ("audio_wait"),
+        Vosk decode time for the utterance ("asr_decode") and its audio
+        length, plus a counter per worker event.
+        """
+        waiting_since = time.perf_counter()
         while True:
+            msg = self.worker.get(timeout=0.5)
+            if msg is None:
+                if not self.worker.alive():
+                    raise RuntimeError("Audio worker stopped unexpectedly.")
+                continue
+
+            kind, sentence, stats = msg
+            METRICS.inc("athena_asr_events_total", kind=kind)
+            if kind == "error":
+                raise RuntimeError(sentence)
+            if kind == "ready":
+                METRICS.observe("athena_startup_seconds", stats.get("load_s", 0.0), subsystem="asr_model")
+                print(f"[Voice] Speech model loaded in {stats.get('load_s', 0.0):.2f}s")
+                continue
+            if kind == "partial":
+                if on_partial:
+                    try:
+                        on_partial(self._strip_wake_word(sentence))
+                    except Exception as e:
+                        print(f"[Voice] ⚠️ partial handler failed: {e}")
+                continue
+            if kind == "overrun":
+                print(f"Speech recognizer fell behind, skipped {stats['dropped_s']:.1f}s of audio.")
+                continue
+            if kind != "final":
+                continue
+
+            METRICS.observe("athena_stage_seconds", time.perf_counter() - waiting_since, stage="audio_wait")
+            if stats:
+                METRICS.observe("athena_stage_seconds", stats.get("decode_s", 0.0), stage="asr_decode")
+                METRICS.observe("athena_asr_audio_seconds", stats.get("audio_s", 0.0))
+            return self._respond(sentence)
+
+    def _respond(self, sentence):
+        """
+        Post-processing shared by every input: wake word, end words.
+        """
+        print(sentence)
+        sentence = self._strip_wake_word(sentence)
+
+        if sentence in self.end_words:
+            print("See you next time.")
+            return "END_SESSION"
+
+        if sentence in self.action_words:
+            response = f"I'm here, {random.choice(self.worker_words)}."
+            print(response)
+            return response
+
+        # Return the detected sentence for further processing
+        return sentence
+
+    def _strip_wake_word(self, sentence):
+        return strip_wake_word(sentence, self.action_words)
+
+    def close(self):
+        self.worker.stop()
+
+
+class FileVoiceRecognition(VoiceRecognition):
+    """
+    VoiceRecognition that replays recordings (WAV / raw 16 kHz PCM files,
+    or directories of them) instead of listening to the microphone. Each
+    file goes through the same UtteranceDecoder and post-processing as
+    live audio; listen() returns their utterances in order, then
+    "END_SESSION". Decoding runs in-process, no audio worker is started.
+    """
+
+    def __init__(self, model_path, paths, action_words, end_words, worker_words):
+        from vosk import Model
+        self.decoder = UtteranceDecoder(Model(model_path))
+        self.files = deque(audio_files(paths))
+        self.pending = deque()
+
+        self.action_words = action_words
+        self.end_words = end_words
+        self.worker_words = worker_words
+
+    def listen(self, on_partial=None):
+        while not self.pending:
+            if not self.files:
+                return "END_SESSION"
+            path = self.files.popleft()
             try:
-                data = self.stream.read(4096, exception_on_overflow=False)  # Handle overflow more gracefully
-
-                if self.recognizer.AcceptWaveform(data):
-                    text = self.recognizer.Result()
-                    sentence = text[14:-3].strip().lower()
-                    if sentence:
-                        print(sentence)
-
-                    # Skip blank or irrelevant sentences
-                    if not sentence:
-                        continue
-
-                    if sentence in self.end_words:
-                        print("See you next time.")
-                        return "END_SESSION"
-
-                    if sentence in self.action_words:
-                        response = f"I'm here, {random.choice(self.worker_words)}."
-                        print(response)
-                        return response
-
-                    # Return the detected sentence for further processing
-                    return sentence
-
-            except OSError as e:
-                if e.errno == -9981:  # Input overflowed
-                    print("Input overflowed, retrying...")
-                    continue
-                else:
-                    raise e
-
-def create_voice_recognition():
-    model_path = r"E:\Users\Elliot\OneDrive\OneDrive - Queensland University of Technology\00AthenaV2\Bot\vosk-model-small-en-us-0.15"
-    action_words = ["athena", "computer", "jarvis"]
-    end_words = ["stop", "end", "goodbye", "goodnight", "good night"]
-    worker_words = ["Boss", "Love", "Sir"]
-    
-    return VoiceRecognition(model_path, action_words, end_words, worker_words)
\ No newline at end of file
+                sentences, stats = transcribe_pcm(self.decoder, read_pcm(path))
+            except (OSError, ValueError) as e:
+                print(f"[Voice] ⚠️ skipping {path}: {e}")
+                continue
+            METRICS.observe("athena_stage_seconds", stats["decode_s"], stage="asr_decode")
+            METRICS.observe("athena_asr_audio_seconds", stats["audio_s"])
+            self.pending.extend(sentences)
+        return self._respond(self.pending.popleft())
+
+    def close(self):
+        self.files.clear()
+        self.pending.clear()
+
+
+def create_voice_recognition(model_path=None, replay=None):
+    """
+    Live microphone recognition, or replay of recordings when `replay`
+    (or ATHENA_VOICE_REPLAY, os.pathsep-separated) names files/directories.
+    """
+    model_path = model_path or MODEL_PATH
+    replay = replay or os.environ.get("ATHENA_VOICE_REPLAY")
+    if replay:
+        paths = replay.split(os.pathsep) if isinstance(replay, str) else list(replay)
+        return FileVoiceRecognition(model_path, paths, ACTION_WORDS, END_WORDS, WORKER_WORDS)
+    return VoiceRecognition(model_path, ACTION_WORDS, END_WORDS, WORKER_WORDS)
@@ -0,0 +1,243 @@
+"""
+ATHENA query-pipeline benchmarks.
+
+Generates synthetic TOOL_SPEC tools (10 .. 10,000 examples) plus a
+synthetic utterance corpus, then times the hot paths:
+
+  build_index     MultiStageProcessor._build_command_tfidf
+  best_match      MultiStageProcessor._best_match (incl. exact/memo fast path)
+  top_matches     MultiStageProcessor.top_matches (TF-IDF matcher only)
+  merge_params    MultiStageProcessor._merge_params
+  process_query   end-to-end process_query with stub tool functions
+  predict_intent  IntentRecognizer.predict_intent
+
+Results (latency percentiles in ms, throughput in ops/s, peak traced
+memory in KiB) are written as JSON so runs can be diffed over time.
+
+    python benchmarks/bench_pipeline.py --sizes 10 100 1000 10000 --output bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bot")
+sys.path.insert(0, os.path.abspath(BOT_DIR))
+
+from multi_stage_processor import MultiStageProcessor  # noqa: E402
+from intent_recogniser import IntentRecognizer  # noqa: E402
+
+VERBS = ["turn", "switch", "set", "show", "play", "open", "check", "start", "stop", "make", "tell", "find"]
+NOUNS = ["lights", "music", "weather", "calendar", "heater", "blinds", "tv", "alarm", "timer", "kettle",
+         "fan", "door", "garage", "oven", "speaker", "reminder", "playlist", "forecast", "meeting", "lamp"]
+EXTRAS = ["please", "now", "for me", "in the kitchen", "in the bedroom", "tomorrow", "tonight", "quickly",
+          "to fifty percent", "a bit", "again", "right away", "in sydney", "at seven"]
+FILLER = ["uh", "hey", "athena", "could you", "can you", "i want to", "um"]
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+def _phrase(rng):
+    words = [rng.choice(VERBS), rng.choice(["on", "off", "up", "down", "the", "my", ""]), rng.choice(NOUNS)]
+    if rng.random() < 0.6:
+        words.append(rng.choice(EXTRAS))
+    return " ".join(w for w in words if w)
+
+
+def generate_tools(root, n_examples, rng, examples_per_cmd=5, cmds_per_tool=8):
+    """
+    Write synthetic tool modules + tools.json under root. Returns (manifest_path, examples).
+    """
+    pkg = f"bench_tools_{n_examples}"
+    pkg_dir = os.path.join(root, pkg)
+    os.makedirs(pkg_dir, exist_ok=True)
+    open(os.path.join(pkg_dir, "__init__.py"), "w").close()
+
+    n_cmds = max(1, n_examples // examples_per_cmd)
+    n_tools = max(1, -(-n_cmds // cmds_per_tool))
+    manifest, examples = {}, []
+    made = 0
+    for t in range(n_tools):
+        commands, funcs = {}, []
+        for c in range(cmds_per_tool):
+            if made >= n_examples:
+                break
+            take = min(examples_per_cmd, n_examples - made)
+            exs = [_phrase(rng) for _ in range(take)]
+            made += take
+            examples.extend(exs)
+            name = f"cmd_{c}"
+            commands[name] = {"examples": exs, "params": ["device"], "defaults": {"device": "all"},
+                              "function": name}
+            funcs.append(f"def {name}(**params):\n    return \"{name} done\"\n")
+        if not commands:
+            break
+        intent = f"tool_{t}"
+        spec = {"intent": intent, "description": "synthetic", "commands": commands}
+        with open(os.path.join(pkg_dir, f"{intent}.py"), "w", encoding="utf-8") as f:
+            f.write(f"TOOL_SPEC = {spec!r}\n\n\n" + "\n\n".join(funcs))
+        manifest[intent] = f"{pkg}.{intent}"
+
+    manifest_path = os.path.join(root, f"tools_{n_examples}.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest_path, examples
+
+
+def generate_intents(root, n_examples, rng, examples_per_intent=5):
+    intents = {}
+    for i in range(max(1, n_examples // examples_per_intent)):
+        intents[f"intent_{i}"] = [_phrase(rng) for _ in range(examples_per_intent)]
+    path = os.path.join(root, f"intents_{n_examples}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(intents, f)
+    return path
+
+
+def generate_utterances(examples, n, rng):
+    """
+    Mix of near-copies of real examples (with filler/dropped words) and noise.
+    """
+    out = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.7 and examples:
+            words = rng.choice(examples).split()
+            if len(words) > 2 and rng.random() < 0.3:
+                words.pop(rng.randrange(len(words)))
+            if rng.random() < 0.4:
+                words.insert(0, rng.choice(FILLER))
+            out.append(" ".join(words))
+        elif roll < 0.9:
+            out.append(_phrase(rng))
+        else:
+            out.append(" ".join(rng.choice(FILLER + NOUNS) for _ in range(rng.randint(1, 6))))
+    return out
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def measure(fn, inputs, warmup=5):
+    """
+    Time fn(x) for every x. Latency pass and memory pass are separate
+    because tracemalloc slows allocation-heavy code down.
+    """
+    for x in inputs[:warmup]:
+        fn(x)
+
+    samples = []
+    start = time.perf_counter()
+    for x in inputs:
+        t0 = time.perf_counter()
+        fn(x)
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    for x in inputs[:min(len(inputs), 50)]:
+        fn(x)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(samples),
+        "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+        "p50_ms": _percentile(ms, 0.50),
+        "p90_ms": _percentile(ms, 0.90),
+        "p99_ms": _percentile(ms, 0.99),
+        "max_ms": ms[-1] if ms else 0.0,
+        "throughput_ops": len(samples) / total if total else 0.0,
+        "peak_mem_kib": peak / 1024,
+    }
+
+
+def bench_size(root, n_examples, n_queries, rng):
+    manifest, examples = generate_tools(root, n_examples, rng)
+    intents_path = generate_intents(root, n_examples, rng)
+    utterances = generate_utterances(examples, n_queries, rng)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    with quiet:
+        msp = MultiStageProcessor(manifest, index_cache_dir=None)
+    try:
+        matches = [msp._best_match(u) for u in utterances]
+        matched = [(intent, cmd, u) for (intent, cmd, _, _), u in zip(matches, utterances) if intent]
+        rounds = max(3, min(20, 2000 // max(1, n_examples // 10)))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = {
+                "build_index": measure(lambda _: msp._build_command_tfidf(), list(range(rounds)), warmup=1),
+                "top_matches": measure(lambda u: msp.top_matches(u, k=1), utterances),
+                "best_match": measure(msp._best_match, utterances),
+                "merge_params": measure(lambda m: msp._merge_params(*m), matched),
+                "process_query": measure(msp.process_query, utterances),
+            }
+            recognizer = IntentRecognizer(intents_path, index_cache_dir=None)
+            results["predict_intent"] = measure(recognizer.predict_intent, utterances)
+    finally:
+        msp.close()
+
+    return {
+        "examples": n_examples,
+        "match_stats": msp.match_stats(),
+        "commands": len(msp.tool_registry.commands),
+        "tools": len(msp.tool_registry.module_paths),
+        "queries": n_queries,
+        "stages": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="total example counts to generate")
+    parser.add_argument("--queries", type=int, default=500, help="utterances per size")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    report = {
+        "benchmark": "athena.query_pipeline",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="athena-bench-") as root:
+        sys.path.insert(0, root)
+        for size in args.sizes:
+            print(f"[bench] {size} examples...", file=sys.stderr)
+            report["results"].append(bench_size(root, size, args.queries, rng))
+
+    blob = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(blob)
+    else:
+        print(blob)
+
+
+if __name__ == "__main__":
+    main()